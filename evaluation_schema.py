@@ -16,3 +16,17 @@ class RequirementEvaluationSchema(BaseModel):
     evidence: List[str]
     gaps: List[str]
     recommendations: List[str]
+
+
+class BatchRequirementEvaluation(RequirementEvaluationSchema):
+    """Single requirement result inside a batched evaluation response."""
+
+    requirement_id: str
+
+
+class BatchEvaluation(BaseModel):
+    """Structured output for evaluating several requirements in one call."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    results: List[BatchRequirementEvaluation]
@@ -0,0 +1,72 @@
+"""Shared Excel export for the evaluation scripts.
+
+With xlsxwriter installed, sheets are written in constant_memory mode and each
+row is flushed as soon as it is produced, so callers can pass generators and
+never hold a whole sheet. Without it, openpyxl's write-only workbook is used;
+that needs column widths before the first row, so the fallback buffers one
+sheet's rows at a time.
+"""
+
+from pathlib import Path
+from typing import Any, Iterable, List, Sequence, Tuple
+
+try:
+    import xlsxwriter  # type: ignore
+    XLSXWRITER_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    xlsxwriter = None  # type: ignore
+    XLSXWRITER_AVAILABLE = False
+
+Row = Sequence[Any]
+
+MAX_COLUMN_WIDTH = 80
+
+
+def write_workbook(excel_path: Path, sheets: Iterable[Tuple[str, Iterable[Row]]]) -> None:
+    """Write (title, rows) sheets to excel_path, sizing each column to its longest value."""
+    if XLSXWRITER_AVAILABLE:
+        workbook = xlsxwriter.Workbook(str(excel_path), {"constant_memory": True})
+        try:
+            for title, rows in sheets:
+                worksheet = workbook.add_worksheet(title)
+                widths: List[int] = []
+                for row_index, row in enumerate(rows):
+                    worksheet.write_row(row_index, 0, row)
+                    _update_widths(widths, row)
+                # Column settings are emitted when the workbook closes, so they can follow the rows
+                for index, length in enumerate(widths):
+                    worksheet.set_column(index, index, _display_width(length))
+        finally:
+            workbook.close()
+        return
+
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    for title, rows in sheets:
+        worksheet = workbook.create_sheet(title=title)
+        rows = list(rows)
+        widths = []
+        for row in rows:
+            _update_widths(widths, row)
+        # Write-only sheets emit column settings ahead of the first row
+        for index, length in enumerate(widths, start=1):
+            worksheet.column_dimensions[get_column_letter(index)].width = _display_width(length)
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(excel_path)
+
+
+def _update_widths(widths: List[int], row: Row) -> None:
+    """Fold one row into the running maximum display length of each column."""
+    for index, value in enumerate(row):
+        length = len(str(value or ""))
+        if index == len(widths):
+            widths.append(length)
+        elif length > widths[index]:
+            widths[index] = length
+
+
+def _display_width(length: int) -> int:
+    return min(length + 2, MAX_COLUMN_WIDTH)
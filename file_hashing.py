@@ -0,0 +1,10 @@
+"""Content hashing shared by the evaluators' upload caches."""
+
+import hashlib
+from pathlib import Path
+
+
+def sha256_file(path: Path) -> str:
+    """Return the sha256 hex digest of a file without reading it into memory."""
+    with open(path, "rb") as fh:
+        return hashlib.file_digest(fh, "sha256").hexdigest()
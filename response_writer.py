@@ -0,0 +1,46 @@
+"""Background writer for the evaluators' raw model responses.
+
+Workers put (path, text) pairs on a queue and a single task writes them off
+the event loop, so a worker gives its concurrency slot back without waiting on
+disk I/O. ``text`` may be a callable to defer serialising a parsed payload to
+the writer thread.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable, Union
+
+logger = logging.getLogger(__name__)
+
+RawText = Union[str, Callable[[], str]]
+
+
+@asynccontextmanager
+async def response_writer() -> AsyncIterator[asyncio.Queue]:
+    """Yield a write queue; on normal exit, wait until everything queued is on disk."""
+    write_queue: asyncio.Queue = asyncio.Queue()
+    writer_task = asyncio.create_task(_drain_writes(write_queue))
+    try:
+        yield write_queue
+        await write_queue.join()
+    finally:
+        writer_task.cancel()
+
+
+async def _drain_writes(write_queue: asyncio.Queue) -> None:
+    """Write queued (path, text) pairs one at a time off the event loop."""
+    while True:
+        path, text = await write_queue.get()
+        try:
+            await asyncio.to_thread(_write_text, path, text)
+        except Exception:
+            # Keep draining: a dead writer would leave write_queue.join() waiting forever
+            logger.exception("Failed to write raw response %s", path)
+        finally:
+            write_queue.task_done()
+
+
+def _write_text(path: Path, text: RawText) -> None:
+    path.write_text(text() if callable(text) else text, encoding="utf-8")
@@ -116,14 +116,17 @@ async def _evaluate_single_run(
     output_dir: Path,
 ) -> Tuple[str, Dict[str, Any]]:
     """Call the evaluator for a single requirement/run_index and return (model_label, raw_output)."""
-    semaphore = asyncio.Semaphore(1)
     try:
-        result = await evaluator._evaluate_single_requirement(  # pylint: disable=protected-access
-            file_ref=file_ref,
-            requirement=requirement,
-            semaphore=semaphore,
-            run_responses_dir=output_dir,
-        )
+        if hasattr(evaluator, "evaluate_requirement"):
+            # test_evaluation variant
+            result = await evaluator.evaluate_requirement(file_ref, requirement, output_dir)
+        else:
+            result = await evaluator._evaluate_single_requirement(  # pylint: disable=protected-access
+                file_ref=file_ref,
+                requirement=requirement,
+                semaphore=asyncio.Semaphore(1),
+                run_responses_dir=output_dir,
+            )
     except Exception as exc:  # pragma: no cover - model call failures
         logger.exception("Evaluation failed for requirement %s run %s", requirement.get("id"), run_index)
         result = {
@@ -188,61 +191,66 @@ async def run_batch(batch_id: str, config_label: str) -> None:
             raise
 
     evaluator = VisionResponsesEvaluator()
-
-    for doc in EVAL_DOCS:
-        doc_id = doc["id"]
-        path_obj, should_cleanup = _materialize_document_path(doc)
-
-        file_ref, file_hash, cache_hit = await evaluator.ensure_file_ref(path_obj)
-        logger.info(
-            "Prepared doc_id=%s path=%s file_ref=%s cache_hit=%s sha256=%s",
-            doc_id,
-            path_obj,
-            file_ref,
-            cache_hit,
-            file_hash[:12],
-        )
-
-        run_responses_dir = evaluator.responses_dir / f"batch_{batch_id}_{doc_id}"
-        run_responses_dir.mkdir(parents=True, exist_ok=True)
-
-        for requirement_id in EVAL_REQUIREMENTS:
-            requirement = requirements_map.get(requirement_id)
-            if not requirement:
-                logger.error("Requirement %s not found; skipping", requirement_id)
-                continue
-
-            for run_index in range(NUM_RUNS):
-                logger.info(
-                    "Running doc=%s requirement=%s run_index=%s",
-                    doc_id,
-                    requirement_id,
-                    run_index,
-                )
-                model_label, raw_output = await _evaluate_single_run(
-                    evaluator=evaluator,
-                    file_ref=file_ref,
-                    requirement=requirement,
-                    run_index=run_index,
-                    output_dir=run_responses_dir,
-                )
-
-                row = {
-                    "batch_id": batch_id,
-                    "config_label": config_label,
-                    "doc_id": doc_id,
-                    "requirement_id": requirement_id,
-                    "run_index": run_index,
-                    "model_label": model_label,
-                    "raw_output": raw_output,
-                }
-                await _insert_eval_result(supabase, row)
-
-        if should_cleanup:
-            try:
-                path_obj.unlink(missing_ok=True)
-            except Exception as exc:
-                logger.warning("Failed to clean up temp file %s: %s", path_obj, exc)
+    try:
+        for doc in EVAL_DOCS:
+            doc_id = doc["id"]
+            path_obj, should_cleanup = _materialize_document_path(doc)
+
+            file_ref, file_hash, cache_hit = await evaluator.ensure_file_ref(path_obj)
+            logger.info(
+                "Prepared doc_id=%s path=%s file_ref=%s cache_hit=%s sha256=%s",
+                doc_id,
+                path_obj,
+                file_ref,
+                cache_hit,
+                file_hash[:12],
+            )
+
+            run_responses_dir = evaluator.responses_dir / f"batch_{batch_id}_{doc_id}"
+            run_responses_dir.mkdir(parents=True, exist_ok=True)
+
+            for requirement_id in EVAL_REQUIREMENTS:
+                requirement = requirements_map.get(requirement_id)
+                if not requirement:
+                    logger.error("Requirement %s not found; skipping", requirement_id)
+                    continue
+
+                for run_index in range(NUM_RUNS):
+                    logger.info(
+                        "Running doc=%s requirement=%s run_index=%s",
+                        doc_id,
+                        requirement_id,
+                        run_index,
+                    )
+                    model_label, raw_output = await _evaluate_single_run(
+                        evaluator=evaluator,
+                        file_ref=file_ref,
+                        requirement=requirement,
+                        run_index=run_index,
+                        output_dir=run_responses_dir,
+                    )
+
+                    row = {
+                        "batch_id": batch_id,
+                        "config_label": config_label,
+                        "doc_id": doc_id,
+                        "requirement_id": requirement_id,
+                        "run_index": run_index,
+                        "model_label": model_label,
+                        "raw_output": raw_output,
+                    }
+                    await _insert_eval_result(supabase, row)
+
+            if should_cleanup:
+                try:
+                    path_obj.unlink(missing_ok=True)
+                except Exception as exc:
+                    logger.warning("Failed to clean up temp file %s: %s", path_obj, exc)
+    finally:
+        # The test_evaluation variant owns pooled HTTP connections and sqlite caches
+        close = getattr(evaluator, "aclose", None)
+        if close is not None:
+            await close()
 
     logger.info("Completed batch %s", batch_id)
 
@@ -14,11 +14,13 @@ import argparse
 import asyncio
 import hashlib
 import json
+import logging
 import os
 import re
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -26,10 +28,12 @@ load_dotenv()
 
 import PyPDF2
 from openai import AsyncOpenAI
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from pydantic import TypeAdapter
 
 from evaluation_schema import RequirementEvaluationSchema
+from excel_export import write_workbook
+from file_hashing import sha256_file
+from response_writer import response_writer
 
 try:
     from docx import Document  # type: ignore
@@ -38,6 +42,38 @@ except ImportError:  # pragma: no cover - optional dependency
     Document = None  # type: ignore
     DOCX_AVAILABLE = False
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+try:
+    import orjson  # type: ignore
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PAGE_HEADING_RE = re.compile(r"^## Page (\d+)$", re.MULTILINE)
+_KEYWORD_RE = re.compile(r"\w{4,}")
+
+
+def _json_loads(raw: bytes):
+    """Decode JSON with orjson when available, falling back to the stdlib."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(data, *, indent: bool = True) -> bytes:
+    """Encode JSON to UTF-8 bytes with orjson when available, falling back to the stdlib."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, indent=2 if indent else None).encode("utf-8")
+
 
 class HybridEvaluator:
     """Evaluate ISO requirements using markdown context plus file attachment."""
@@ -52,8 +88,8 @@ class HybridEvaluator:
         "{\n"
         "  \"status\": \"PASS|FAIL|FLAGGED|NOT_APPLICABLE\",\n"
         "  \"confidence\": \"low|medium|high\",\n"
-        "  \"rationale\": string,\n"
-        "  \"evidence\": [string],\n"
+        "  \"rationale\": \"Explain satisfied/unsatisfied criteria with citations\",\n"
+        "  \"evidence\": [\"Page/Section citation with quote\", ...],\n"
         "  \"gaps\": [string],\n"
         "  \"recommendations\": [string]\n"
         "}\n"
@@ -63,6 +99,18 @@ class HybridEvaluator:
         "- Use \"low\" when evidence is sparse, ambiguous, uncertain, or requires significant assumptions\n"
     )
 
+    MANDATORY_METHOD = (
+        "MANDATORY METHOD:\n"
+        "1. Start with the markdown excerpt; consult the attached document when additional visual or formatting detail is needed.\n"
+        "2. Evaluate each acceptance criterion individually and cite page or section references from either source.\n"
+        "3. Use PASS when all criteria are clearly satisfied with explicit evidence, FAIL when evidence is clearly missing or contradictory, and FLAGGED only when the evidence is partial or genuinely uncertain.\n"
+        "4. Confirm that the final status reflects the strength of the evidence; avoid defaulting to FLAGGED when PASS or FAIL is clearly supported.\n"
+    )
+
+    EVIDENCE_FOOTER = (
+        "When referencing evidence, include short quotes with page/section identifiers. If the excerpt omits critical details, state that you confirmed them in the attachment.\n"
+    )
+
     def __init__(
         self,
         *,
@@ -75,10 +123,15 @@ class HybridEvaluator:
 
         self.model = model or os.getenv("OPENAI_HYBRID_MODEL", os.getenv("OPENAI_MODEL", "gpt-5"))
         self.client = AsyncOpenAI(api_key=api_key)
+        # Reused for every parsed response so the serializer is built once
+        self._requirement_adapter = TypeAdapter(RequirementEvaluationSchema)
 
         self.context_char_limit = int(os.getenv("HYBRID_CONTEXT_CHAR_LIMIT", "90000"))
         self.concurrent_requests = int(os.getenv("HYBRID_EVALUATOR_CONCURRENCY", "3"))
         self.reasoning_effort = os.getenv('HYBRID_REASONING_EFFORT', 'medium')
+        # Opt-in: send only the pages relevant to each requirement instead of
+        # the shared context prefix (trades prompt caching for fewer tokens).
+        self.page_filter = os.getenv("HYBRID_PAGE_FILTER", "").lower() in {"1", "true", "yes"}
 
         base_dir = Path(__file__).parent
         self.base_dir = base_dir
@@ -90,11 +143,13 @@ class HybridEvaluator:
         for directory in (self.output_dir, self.responses_dir, self.markdown_dir):
             directory.mkdir(parents=True, exist_ok=True)
 
-        # Shared cache so other evaluators can reuse uploads
-        self.cache_path = base_dir / "output" / "uploaded_files_cache.json"
+        # Shared append-only cache so other evaluators can reuse uploads
+        self.cache_path = base_dir / "output" / "uploaded_files_cache.jsonl"
+        self.cache_lock_path = self.cache_path.with_name(self.cache_path.name + ".lock")
+        self.legacy_cache_path = base_dir / "output" / "uploaded_files_cache.json"
         self.file_cache = self._load_cache()
 
-    async def evaluate_document(self, file_path: str) -> Dict:
+    async def evaluate_document(self, file_path: str, resume_run_id: Optional[str] = None) -> Dict:
         document_path = Path(file_path)
         if not document_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
@@ -105,12 +160,30 @@ class HybridEvaluator:
         file_id, file_hash, cache_hit = await self.ensure_file_id(document_path)
         requirements = self._load_requirements()
 
-        run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        run_id = resume_run_id or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         run_responses_dir = self.responses_dir / run_id
         run_responses_dir.mkdir(parents=True, exist_ok=True)
 
+        # Every finished requirement is appended here as it lands, so an
+        # interrupted run can be resumed without re-evaluating it. The header
+        # ties the file to this document and requirement set.
+        partial_path = run_responses_dir / "_partial.jsonl"
+        partial_header = {
+            "file_hash": file_hash,
+            "requirements_fingerprint": self._requirements_fingerprint(requirements),
+        }
+        if resume_run_id and partial_path.exists():
+            completed = self._load_partial_results(partial_path, partial_header)
+            logger.info("Resuming run %s with %d completed requirements", run_id, len(completed))
+        else:
+            completed = {}
+            self._start_partial_file(partial_path, partial_header)
+
+        # Write the markdown copy in a worker thread so it overlaps with the API calls
         markdown_file = self.markdown_dir / f"{document_path.stem}_{run_id}.md"
-        markdown_file.write_text(markdown, encoding="utf-8")
+        markdown_write = asyncio.create_task(
+            asyncio.to_thread(markdown_file.write_text, markdown, encoding="utf-8")
+        )
 
         document_stats = {
             "file_name": document_path.name,
@@ -127,43 +200,51 @@ class HybridEvaluator:
             "markdown_file": str(markdown_file.resolve()),
         }
 
-        semaphore = asyncio.Semaphore(self.concurrent_requests)
-        tasks = [
-            self._evaluate_single_requirement(
-                file_id=file_id,
-                requirement=req,
-                semaphore=semaphore,
-                run_responses_dir=run_responses_dir,
-                markdown_context=truncated_markdown,
-            )
-            for req in requirements
-        ]
+        pages = self._index_pages(markdown) if self.page_filter else []
+        document_stats["page_filter"] = bool(pages)
 
-        evaluations = await asyncio.gather(*tasks, return_exceptions=True)
+        # Everything except the requirement block is identical across calls,
+        # so build it once instead of re-concatenating the context per requirement.
+        prompt_prefix = self._build_prompt_prefix(None if pages else truncated_markdown)
 
-        results: List[Dict] = []
-        for requirement, evaluation in zip(requirements, evaluations):
-            if isinstance(evaluation, Exception):
-                results.append({
-                    "requirement_id": requirement["id"],
-                    "status": "ERROR",
-                    "confidence": "low",  # Categorical string confidence
-                    "rationale": str(evaluation),
-                    "evidence": [],
-                    "gaps": ["Evaluation failed"],
-                    "recommendations": ["Retry requirement"],
-                    "tokens_used": 0,
-                })
-            else:
-                results.append(evaluation)
+        semaphore = asyncio.Semaphore(self.concurrent_requests)
+        try:
+            async with response_writer() as write_queue:
+                tasks = [
+                    self._evaluate_or_error(
+                        index=index,
+                        file_id=file_id,
+                        requirement=req,
+                        semaphore=semaphore,
+                        run_responses_dir=run_responses_dir,
+                        write_queue=write_queue,
+                        prompt_prefix=prompt_prefix,
+                        markdown_context=(
+                            self._select_pages(req, pages, truncated_markdown) if pages else None
+                        ),
+                    )
+                    for index, req in enumerate(requirements)
+                    if index not in completed
+                ]
+                # Progress is keyed by position so duplicate requirement IDs stay distinct
+                for next_result in asyncio.as_completed(tasks):
+                    index, result = await next_result
+                    completed[index] = result
+                    await asyncio.to_thread(self._append_partial_result, partial_path, index, result)
+        finally:
+            # Retrieve the markdown write's outcome even if evaluation failed
+            await asyncio.gather(markdown_write, return_exceptions=True)
+
+        results = [completed[index] for index in range(len(requirements))]
+
+        await markdown_write
 
         summary = self._generate_summary(document_stats, results)
-        self._persist_summary(summary, run_id)
+        await asyncio.to_thread(self._persist_summary, summary, run_id)
         return summary
 
     async def ensure_file_id(self, document_path: Path) -> Tuple[str, str, bool]:
-        data = document_path.read_bytes()
-        file_hash = hashlib.sha256(data).hexdigest()
+        file_hash = await asyncio.to_thread(sha256_file, document_path)
         cached_entry = self.file_cache.get(file_hash)
         if cached_entry:
             return cached_entry["file_id"], file_hash, True
@@ -176,9 +257,71 @@ class HybridEvaluator:
             "uploaded_at": datetime.utcnow().isoformat(),
             "file_name": document_path.name,
         }
-        self._save_cache()
+        # flock can block on another process; keep it off the event loop
+        await asyncio.to_thread(self._append_cache_entry, file_hash)
         return upload.id, file_hash, False
 
+    async def _evaluate_or_error(self, *, index: int, requirement: Dict, **kwargs) -> Tuple[int, Dict]:
+        try:
+            return index, await self._evaluate_single_requirement(requirement=requirement, **kwargs)
+        except Exception as exc:  # noqa: BLE001 - recorded as an ERROR result
+            logger.error("Requirement %s failed: %s", requirement["id"], exc)
+            return index, {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",  # Categorical string confidence
+                "rationale": str(exc),
+                "evidence": [],
+                "gaps": ["Evaluation failed"],
+                "recommendations": ["Retry requirement"],
+                "tokens_used": 0,
+            }
+
+    @staticmethod
+    def _requirements_fingerprint(requirements: List[Dict]) -> str:
+        encoded = json.dumps(requirements, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    @staticmethod
+    def _start_partial_file(partial_path: Path, header: Dict[str, Any]) -> None:
+        with open(partial_path, "wb") as fh:
+            fh.write(_json_dumps({"header": header}, indent=False) + b"\n")
+
+    @staticmethod
+    def _append_partial_result(partial_path: Path, index: int, result: Dict) -> None:
+        with open(partial_path, "ab") as fh:
+            fh.write(_json_dumps({"index": index, "result": result}, indent=False) + b"\n")
+
+    @staticmethod
+    def _load_partial_results(partial_path: Path, expected_header: Dict[str, Any]) -> Dict[int, Dict]:
+        """Read finished requirements from a previous run, skipping ERROR records so they are retried.
+
+        Raises ValueError when the partial file was recorded for a different
+        document or requirement set, since mixing the two would corrupt the summary.
+        """
+        completed: Dict[int, Dict] = {}
+        with open(partial_path, "rb") as fh:
+            try:
+                header = _json_loads(fh.readline()).get("header")
+            except ValueError:
+                header = None
+            if header != expected_header:
+                raise ValueError(
+                    f"Cannot resume from {partial_path}: it was recorded for a different "
+                    "document or requirement set"
+                )
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    record = _json_loads(line)
+                except ValueError:
+                    # A crash mid-write can leave a truncated final line
+                    continue
+                if record["result"].get("status") != "ERROR":
+                    completed[record["index"]] = record["result"]
+        return completed
+
     async def _evaluate_single_requirement(
         self,
         *,
@@ -186,11 +329,16 @@ class HybridEvaluator:
         requirement: Dict,
         semaphore: asyncio.Semaphore,
         run_responses_dir: Path,
-        markdown_context: str,
+        write_queue: asyncio.Queue,
+        prompt_prefix: str,
+        markdown_context: Optional[str] = None,
     ) -> Dict:
         async with semaphore:
             prompt = self._build_prompt(requirement, markdown_context)
 
+            # Keep the document-wide prefix and attachment in the first item so
+            # it is byte-identical across requirements and eligible for OpenAI's
+            # automatic prompt caching; only the second item varies per call.
             response = await self.client.responses.parse(
                 model=self.model,
                 reasoning={"effort": self.reasoning_effort},
@@ -198,21 +346,34 @@ class HybridEvaluator:
                     {
                         "role": "user",
                         "content": [
-                            {"type": "input_text", "text": prompt},
+                            {"type": "input_text", "text": prompt_prefix},
                             {"type": "input_file", "file_id": file_id},
                         ],
-                    }
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": prompt},
+                        ],
+                    },
                 ],
                 text_format=RequirementEvaluationSchema,
             )
 
             usage = getattr(response, "usage", None)
             tokens_used = getattr(usage, "total_tokens", 0) if usage else 0
+            input_details = getattr(usage, "input_tokens_details", None) if usage else None
+            logger.info(
+                "Requirement %s: input_tokens=%s cached_tokens=%s",
+                requirement["id"],
+                getattr(usage, "input_tokens", 0) if usage else 0,
+                getattr(input_details, "cached_tokens", 0) if input_details else 0,
+            )
 
             raw_file = run_responses_dir / f"response_{requirement['id'].replace('-', '_')}.txt"
             parsed_model = getattr(response, "output_parsed", None)
             if parsed_model is None:
-                raw_file.write_text("", encoding="utf-8")
+                await write_queue.put((raw_file, ""))
                 return {
                     "requirement_id": requirement["id"],
                     "status": "ERROR",
@@ -224,43 +385,27 @@ class HybridEvaluator:
                     "tokens_used": tokens_used,
                 }
 
-            parsed = parsed_model.model_dump()
+            parsed = self._requirement_adapter.dump_python(parsed_model)
             parsed.setdefault("requirement_id", requirement["id"])
             parsed["tokens_used"] = tokens_used
-            raw_text = getattr(response, "output_text", None) or json.dumps(parsed, indent=2)
-            raw_file.write_text(raw_text, encoding="utf-8")
+            raw_text = getattr(response, "output_text", None) or _json_dumps(parsed).decode("utf-8")
+            await write_queue.put((raw_file, raw_text))
             return parsed
 
-    def _build_prompt(self, requirement: Dict, markdown_context: str) -> str:
+    def _build_prompt_prefix(self, markdown_context: Optional[str]) -> str:
+        """Assemble the requirement-independent part of the prompt once per document."""
         sections = [self.BASE_INSTRUCTION, self.RESPONSE_SCHEMA]
+        if markdown_context is not None:
+            sections.append(
+                "COMBINED MARKDOWN CONTEXT (truncated):\n"
+                f"{markdown_context}\n"
+            )
+        sections.append(self.MANDATORY_METHOD)
+        return "\n\n".join(sections)
 
-        sections.append(
-            "COMBINED MARKDOWN CONTEXT (truncated):\n"
-            f"{markdown_context}\n"
-        )
-
-        sections.append(
-            "MANDATORY METHOD:\n"
-            "1. Start with the markdown excerpt; consult the attached document when additional visual or formatting detail is needed.\n"
-            "2. Evaluate each acceptance criterion individually and cite page or section references from either source.\n"
-            "3. Use PASS when all criteria are clearly satisfied with explicit evidence, FAIL when evidence is clearly missing or contradictory, and FLAGGED only when the evidence is partial or genuinely uncertain.\n"
-            "4. Confirm that the final status reflects the strength of the evidence; avoid defaulting to FLAGGED when PASS or FAIL is clearly supported.\n"
-            "Respond strictly with JSON using this schema:\n"
-            "{\n"
-            "  \"status\": \"PASS|FAIL|FLAGGED|NOT_APPLICABLE\",\n"
-            "  \"confidence\": \"low|medium|high\",\n"
-            "  \"rationale\": \"Explain satisfied/unsatisfied criteria with citations\",\n"
-            "  \"evidence\": [\"Page/Section citation with quote\", ...],\n"
-            "  \"gaps\": [string],\n"
-            "  \"recommendations\": [string]\n"
-            "}\n"
-            "Confidence level guidelines:\n"
-            "- Use \"high\" when evidence is explicit, comprehensive, and directly addresses all criteria\n"
-            "- Use \"medium\" when evidence is present but incomplete, requires some inference, or has minor gaps\n"
-            "- Use \"low\" when evidence is sparse, ambiguous, uncertain, or requires significant assumptions\n"
-        )
-
-        sections.append(
+    def _build_prompt(self, requirement: Dict, markdown_context: Optional[str] = None) -> str:
+        """Return the per-requirement tail that follows the shared prompt prefix."""
+        requirement_block = (
             "Requirement to evaluate:\n"
             f"- ID: {requirement['id']}\n"
             f"- Clause: {requirement['clause']}\n"
@@ -269,13 +414,56 @@ class HybridEvaluator:
             f"- Acceptance Criteria: {requirement['acceptance_criteria']}\n"
             f"- Expected Artifacts: {requirement.get('expected_artifacts', 'Not specified')}"
         )
-
-        sections.append(
-            "When referencing evidence, include short quotes with page/section identifiers. If the excerpt omits critical details, state that you confirmed them in the attachment.\n"
+        if markdown_context is not None:
+            requirement_block = (
+                "MARKDOWN CONTEXT (pages selected for this requirement):\n"
+                f"{markdown_context}\n\n{requirement_block}"
+            )
+        return f"{requirement_block}\n\n{self.EVIDENCE_FOOTER}"
+
+    def _index_pages(self, markdown: str) -> List[Tuple[int, str, set]]:
+        """Split converted PDF markdown on its '## Page N' headings, with a keyword set per page."""
+        headings = list(_PAGE_HEADING_RE.finditer(markdown))
+        pages: List[Tuple[int, str, set]] = []
+        for index, match in enumerate(headings):
+            end = headings[index + 1].start() if index + 1 < len(headings) else len(markdown)
+            text = markdown[match.start():end].strip()
+            pages.append((int(match.group(1)), text, set(_KEYWORD_RE.findall(text.lower()))))
+        return pages
+
+    def _select_pages(
+        self,
+        requirement: Dict,
+        pages: List[Tuple[int, str, set]],
+        fallback: str,
+    ) -> str:
+        """Pick the best-matching pages (plus neighbours) for a requirement within the char limit."""
+        keywords = set(_KEYWORD_RE.findall(
+            f"{requirement.get('requirement_text', '')} {requirement.get('acceptance_criteria', '')}".lower()
+        ))
+        scores = [len(keywords & page_keywords) for _, _, page_keywords in pages]
+        ranked = sorted(
+            (index for index, score in enumerate(scores) if score),
+            key=lambda index: -scores[index],
         )
+        if not ranked:
+            return fallback
+
+        selected: set = set()
+        used_chars = 0
+        for index in ranked:
+            for candidate in (index, index - 1, index + 1):
+                if candidate in selected or not 0 <= candidate < len(pages):
+                    continue
+                page_chars = len(pages[candidate][1])
+                if used_chars + page_chars > self.context_char_limit:
+                    continue
+                selected.add(candidate)
+                used_chars += page_chars
 
-
-        return "\n\n".join(sections)
+        if not selected:
+            return fallback
+        return "\n\n".join(pages[index][1] for index in sorted(selected))
 
     def _convert_to_markdown(self, document_path: Path) -> str:
         suffix = document_path.suffix.lower()
@@ -336,17 +524,16 @@ class HybridEvaluator:
         return markdown
 
     def _normalize_pdf_text(self, text: str) -> str:
-        lines = text.splitlines()
-        markdown_lines: List[str] = []
-        for line in lines:
-            cleaned = " ".join(line.split())
-            if not cleaned:
-                continue
-            if len(cleaned) < 100 and cleaned.isupper() and len(cleaned.split()) <= 10:
-                markdown_lines.append(f"### {cleaned.title()}")
-            else:
-                markdown_lines.append(cleaned)
-        return "\n\n".join(markdown_lines)
+        cleaned_lines = (_WHITESPACE_RE.sub(" ", line).strip() for line in text.splitlines())
+        # Short all-caps lines become headings; count(" ") <= 9 is the
+        # word-count check without a second split of the collapsed line.
+        return "\n\n".join(
+            f"### {cleaned.title()}"
+            if len(cleaned) < 100 and cleaned.isupper() and cleaned.count(" ") <= 9
+            else cleaned
+            for cleaned in cleaned_lines
+            if cleaned
+        )
 
     def _extract_response_text(self, response) -> str:
         try:
@@ -367,7 +554,7 @@ class HybridEvaluator:
             return ""
 
     def _load_requirements(self) -> List[Dict]:
-        return json.loads(self.requirements_path.read_text())
+        return _json_loads(self.requirements_path.read_bytes())
 
     def _generate_summary(self, document_stats: Dict, results: List[Dict]) -> Dict:
         status_counts: Dict[str, int] = {"PASS": 0, "FAIL": 0, "FLAGGED": 0, "NOT_APPLICABLE": 0, "ERROR": 0}
@@ -396,37 +583,37 @@ class HybridEvaluator:
 
     def _persist_summary(self, summary: Dict, run_id: str) -> None:
         json_path = self.output_dir / f"hybrid_evaluation_{run_id}.json"
-        json_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        json_path.write_bytes(_json_dumps(summary))
 
         excel_path = self.output_dir / f"hybrid_evaluation_{run_id}.xlsx"
         self._export_to_excel(summary, excel_path)
 
     def _export_to_excel(self, summary: Dict, excel_path: Path) -> None:
-        workbook = Workbook()
-        summary_sheet = workbook.active
-        summary_sheet.title = "Summary"
+        write_workbook(excel_path, [
+            ("Summary", self._summary_rows(summary)),
+            ("Requirements", self._requirement_rows(summary)),
+        ])
 
-        summary_sheet.append(["Field", "Value"])
+    def _summary_rows(self, summary: Dict) -> Iterator[List]:
+        yield ["Field", "Value"]
         for key, value in summary.get("document_info", {}).items():
-            summary_sheet.append([key.replace('_', ' ').title(), value])
+            yield [key.replace('_', ' ').title(), value]
 
-        summary_sheet.append([])
-        summary_sheet.append(["Metric", "Value"])
+        yield []
+        yield ["Metric", "Value"]
         evaluation_summary = summary.get("evaluation_summary", {})
         for key, value in evaluation_summary.items():
             if key == "status_counts":
                 continue
-            summary_sheet.append([key.replace('_', ' ').title(), value])
+            yield [key.replace('_', ' ').title(), value]
 
-        summary_sheet.append([])
-        summary_sheet.append(["Status", "Count"])
+        yield []
+        yield ["Status", "Count"]
         for status, count in evaluation_summary.get("status_counts", {}).items():
-            summary_sheet.append([status, count])
-
-        self._auto_size_columns(summary_sheet)
+            yield [status, count]
 
-        requirements_sheet = workbook.create_sheet(title="Requirements")
-        headers = [
+    def _requirement_rows(self, summary: Dict) -> Iterator[List]:
+        yield [
             "Requirement ID",
             "Status",
             "Confidence",
@@ -436,7 +623,6 @@ class HybridEvaluator:
             "Recommendations",
             "Tokens Used",
         ]
-        requirements_sheet.append(headers)
 
         for record in summary.get("requirements_results", []):
             # Normalize confidence to uppercase categorical label
@@ -446,7 +632,7 @@ class HybridEvaluator:
                 confidence_str = "low"
             confidence_label = confidence_str.upper()
 
-            requirements_sheet.append([
+            yield [
                 record.get("requirement_id"),
                 record.get("status"),
                 confidence_label,
@@ -455,31 +641,73 @@ class HybridEvaluator:
                 "\n".join(record.get("gaps", [])),
                 "\n".join(record.get("recommendations", [])),
                 record.get("tokens_used", 0),
-            ])
-
-        self._auto_size_columns(requirements_sheet)
-        workbook.save(excel_path)
-
-    def _auto_size_columns(self, worksheet) -> None:
-        for column_cells in worksheet.columns:
-            length = max(len(str(cell.value or "")) for cell in column_cells)
-            worksheet.column_dimensions[get_column_letter(column_cells[0].column)].width = min(length + 2, 80)
+            ]
 
     def _load_cache(self) -> Dict[str, Dict[str, str]]:
-        if self.cache_path.exists():
+        cache: Dict[str, Dict[str, str]] = {}
+        if not self.cache_path.exists():
+            # Seed from the pre-JSONL cache file so existing uploads are reused
+            if self.legacy_cache_path.exists():
+                try:
+                    cache.update(_json_loads(self.legacy_cache_path.read_bytes()))
+                except json.JSONDecodeError:
+                    pass
+            return cache
+
+        with open(self.cache_path, "rb") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = _json_loads(line)
+                except json.JSONDecodeError:
+                    # A torn trailing line from an interrupted append; later lines win anyway
+                    continue
+                file_hash = entry.pop("file_hash", None)
+                if file_hash:
+                    cache[file_hash] = entry
+        return cache
+
+    @contextmanager
+    def _cache_lock(self):
+        """Serialise cache writes across evaluator processes sharing the file."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.cache_lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
             try:
-                return json.loads(self.cache_path.read_text())
-            except json.JSONDecodeError:
-                return {}
-        return {}
-
-    def _save_cache(self) -> None:
-        self.cache_path.write_text(json.dumps(self.file_cache, indent=2), encoding="utf-8")
-
-
-async def _async_main(file_path: str) -> None:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _append_cache_entry(self, file_hash: str) -> None:
+        line = _json_dumps({"file_hash": file_hash, **self.file_cache[file_hash]}, indent=False) + b"\n"
+        with self._cache_lock():
+            with open(self.cache_path, "ab") as fh:
+                fh.write(line)
+
+    def compact_cache(self) -> None:
+        """Rewrite the JSONL cache with one line per file hash, dropping superseded entries."""
+        with self._cache_lock():
+            # Merge entries appended by other processes since this one started
+            merged = self._load_cache()
+            merged.update(self.file_cache)
+            self.file_cache = merged
+
+            tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+            with open(tmp_path, "wb") as fh:
+                for file_hash, entry in merged.items():
+                    fh.write(_json_dumps({"file_hash": file_hash, **entry}, indent=False) + b"\n")
+            os.replace(tmp_path, self.cache_path)
+
+async def _async_main(file_path: str, resume_run_id: Optional[str] = None) -> None:
     evaluator = HybridEvaluator()
-    summary = await evaluator.evaluate_document(file_path)
+    try:
+        summary = await evaluator.evaluate_document(file_path, resume_run_id=resume_run_id)
+    finally:
+        evaluator.compact_cache()
 
     counts = summary["evaluation_summary"]["status_counts"]
     print("\n=== Hybrid Evaluation Complete ===")
@@ -495,9 +723,14 @@ async def _async_main(file_path: str) -> None:
 def main() -> None:
     parser = argparse.ArgumentParser(description="ISO 14971 hybrid evaluator")
     parser.add_argument("file_path", help="Path to PDF or DOCX file to evaluate")
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Resume an interrupted run, skipping requirements already in its _partial.jsonl",
+    )
     args = parser.parse_args()
 
-    asyncio.run(_async_main(args.file_path))
+    asyncio.run(_async_main(args.file_path, resume_run_id=args.resume))
 
 
 if __name__ == "__main__":
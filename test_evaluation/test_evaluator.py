@@ -4,40 +4,43 @@ ISO 14971 Test Evaluator
 Test version for document processing and evaluation with first 3 requirements
 """
 
+import importlib.util
+import io
 import os
+import re
 import json
 import sys
 import time
 import argparse
+import functools
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from contextlib import closing
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 
-# Load environment variables from .env file
-from dotenv import load_dotenv
-load_dotenv()
+# Heavy dependencies are imported where they are used so `--help` and argument
+# errors return immediately; only their availability is checked up front.
+def _module_available(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 
-# External libraries
-import PyPDF2
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+PDFIUM_AVAILABLE = _module_available("pypdfium2")
+TIKTOKEN_AVAILABLE = _module_available("tiktoken")
+TABULATE_AVAILABLE = _module_available("tabulate")
+ORJSON_AVAILABLE = _module_available("orjson")
+
+DOCX_AVAILABLE = _module_available("docx")
+if not DOCX_AVAILABLE:
     print("Warning: python-docx not installed. DOCX files won't be supported.")
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+OPENAI_AVAILABLE = _module_available("openai")
+if not OPENAI_AVAILABLE:
     print("Warning: openai not installed. Evaluation won't work.")
 
-from evaluation_schema import RequirementEvaluationSchema
-
+# colorama stays eager: Fore is used in default arguments below
 try:
     from colorama import init, Fore, Style
     init()  # Initialize colorama
@@ -50,26 +53,126 @@ except ImportError:
     class Style:
         BRIGHT = DIM = RESET_ALL = ""
 
-try:
-    from tabulate import tabulate
-    TABULATE_AVAILABLE = True
-except ImportError:
-    TABULATE_AVAILABLE = False
+# Compiled once; _normalize_pdf_text runs for every PDF page
+_MULTI_NL = re.compile(r'\n{3,}')
+_WS = re.compile(r'[^\S\n]+')  # any whitespace run except newlines
+_WORD = re.compile(r'\S+')
+_UNSAFE_ID_CHARS = re.compile(r'[^A-Za-z0-9_]')
+
+# Per-process state for parallel PDF extraction, set up by _init_pdf_worker
+_worker_pdf = None
+_worker_use_pdfium = False
+
+
+def _init_pdf_worker(file_path: str, use_pdfium: bool) -> None:
+    """Open the PDF once per worker process instead of once per page"""
+    global _worker_pdf, _worker_use_pdfium
+    _worker_use_pdfium = use_pdfium
+    if use_pdfium:
+        import pypdfium2 as pdfium
+        _worker_pdf = pdfium.PdfDocument(file_path)
+    else:
+        import PyPDF2
+        _worker_pdf = PyPDF2.PdfReader(file_path)
+
+
+def _extract_page(page_index: int) -> str:
+    """Extract the text of one page in a worker process"""
+    if _worker_use_pdfium:
+        page = _worker_pdf[page_index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+            page.close()
+    return _worker_pdf.pages[page_index].extract_text() or ""
+
+
+@functools.lru_cache(maxsize=8)
+def _load_requirements(path: str, mtime_ns: int) -> tuple:
+    """Parse a requirements file once per (path, mtime); edits invalidate the entry"""
+    with open(path, 'r') as f:
+        requirements = json.load(f)
+    # Filename-safe ID for the debug prompt/response files, computed once here
+    for requirement in requirements:
+        requirement['_id_safe'] = _UNSAFE_ID_CHARS.sub('_', requirement['id'])
+    return tuple(requirements)
 
 
 class TestEvaluator:
     """Test version of ISO 14971 evaluator with markdown output and limited requirements"""
 
-    def __init__(self, openai_api_key: str = None):
+    EVALUATION_INSTRUCTIONS = """You are an ISO 14971:2019 compliance auditor. Review the markdown context below first. If visuals or formatting details are unclear, you may rely on the original document as needed when forming your judgement.
+
+MANDATORY METHOD:
+1. Examine each acceptance criterion individually and explain in your rationale whether it is satisfied.
+2. Provide explicit evidence with page or section references (e.g., "Page 4: ...").
+3. Output PASS when every criterion is clearly satisfied with cited evidence. Use FAIL when evidence is clearly missing or contradictory. Reserve FLAGGED for cases where evidence is partial or genuinely uncertain.
+4. Before finalising, confirm that the chosen status (PASS / FAIL / FLAGGED) best reflects the evidence; do not default to FLAGGED when the evidence clearly supports PASS or FAIL."""
+
+    CONFIDENCE_GUIDELINES = """Confidence level guidelines:
+- Use "high" when evidence is explicit, comprehensive, and directly addresses all criteria
+- Use "medium" when evidence is present but incomplete, requires some inference, or has minor gaps
+- Use "low" when evidence is sparse, ambiguous, uncertain, or requires significant assumptions"""
+
+    RESPONSE_FORMAT = """Respond with JSON only:
+{
+    "status": "PASS|FAIL|FLAGGED|NOT_APPLICABLE",
+    "confidence": "low|medium|high",
+    "rationale": "Explain satisfied/unsatisfied criteria with citations",
+    "evidence": ["Page/Section citation with quote", ...],
+    "gaps": ["Gap 1", ...],
+    "recommendations": ["Next action", ...]
+}"""
+
+    BATCH_RESPONSE_FORMAT = """Evaluate every requirement above independently. Respond with JSON only, with exactly one entry per requirement:
+{
+    "results": [
+        {
+            "requirement_id": "ID exactly as given above",
+            "status": "PASS|FAIL|FLAGGED|NOT_APPLICABLE",
+            "confidence": "low|medium|high",
+            "rationale": "Explain satisfied/unsatisfied criteria with citations",
+            "evidence": ["Page/Section citation with quote", ...],
+            "gaps": ["Gap 1", ...],
+            "recommendations": ["Next action", ...]
+        },
+        ...
+    ]
+}"""
+
+    def __init__(self, openai_api_key: str = None, debug: bool = False):
+        # Load environment variables from .env file
+        from dotenv import load_dotenv
+        load_dotenv()
+
         self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
         if not self.openai_api_key:
             print(f"{Fore.RED}Error: OPENAI_API_KEY not found in environment{Style.RESET_ALL}")
             sys.exit(1)
 
-        self.client = OpenAI(api_key=self.openai_api_key) if OPENAI_AVAILABLE else None
+        if OPENAI_AVAILABLE:
+            from openai import OpenAI
+            self.client = OpenAI(api_key=self.openai_api_key)
+        else:
+            self.client = None
         self.model = os.getenv('OPENAI_MODEL', 'gpt-5')
         self.document_context_char_limit = int(os.getenv('DOCUMENT_CONTEXT_CHAR_LIMIT', '90000'))
+        # Optional token budget for the context (needs tiktoken); 0 keeps the char limit
+        self.document_context_token_limit = int(os.getenv('DOCUMENT_CONTEXT_TOKEN_LIMIT', '0'))
+        self._encoding = None
+        # Prompt/response dumps are large; only write them when debugging
+        self.debug = debug or os.getenv('EVALUATOR_DEBUG') == '1'
         self.reasoning_effort = os.getenv('EVALUATOR_REASONING_EFFORT', 'medium')
+        self.eval_concurrency = int(os.getenv('EVAL_CONCURRENCY', '8'))
+        # Up to this many requirements share one API call; 0 evaluates one at a time
+        self.batch_max_requirements = int(os.getenv('EVALUATOR_BATCH_MAX_REQUIREMENTS', '0'))
+        self.pdf_extract_workers = int(os.getenv('PDF_EXTRACT_WORKERS', str(os.cpu_count() or 1)))
+        self.pdf_parallel_min_pages = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '50'))
+
+        # Requirements are evaluated from worker threads; keep their output lines intact
+        self._print_lock = threading.Lock()
 
         # Setup output directories
         self.base_dir = Path(__file__).parent
@@ -98,113 +201,239 @@ class TestEvaluator:
             "PROCESSING": Fore.MAGENTA
         }
         color = colors.get(status, Fore.WHITE)
-        print(f"{color}[{status}]{Style.RESET_ALL} {text}")
+        with self._print_lock:
+            print(f"{color}[{status}]{Style.RESET_ALL} {text}")
 
     def convert_pdf_to_markdown(self, file_path: str) -> str:
         """Convert PDF to markdown format"""
         self.print_status("Converting PDF to markdown...", "PROCESSING")
-        markdown_sections = []
 
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    page_text = page.extract_text() or ""
-                    normalized = self._normalize_pdf_text(page_text)
-                    if normalized.strip():
-                        markdown_sections.append(f"## Page {page_num}\n\n{normalized}\n")
-
-                markdown = '\n'.join(markdown_sections).strip()
-
-                if not markdown:
-                    raise ValueError("No extractable text found in PDF")
-
-                self.print_status(f"PDF converted: {len(pdf_reader.pages)} pages, {len(markdown)} characters", "SUCCESS")
-                return markdown
+            converted = None
+            if PDFIUM_AVAILABLE:
+                try:
+                    with closing(self._iter_pdf_pages(file_path, use_pdfium=True)) as page_texts:
+                        converted = self._assemble_pdf_markdown(page_texts)
+                except Exception as e:
+                    self.print_status(f"pypdfium2 extraction failed, falling back to PyPDF2: {e}", "WARNING")
+            if converted is None:
+                with closing(self._iter_pdf_pages(file_path, use_pdfium=False)) as page_texts:
+                    converted = self._assemble_pdf_markdown(page_texts)
+
+            markdown, page_count, length = converted
+
+            if not length:
+                raise ValueError("No extractable text found in PDF")
+
+            self.print_status(f"PDF converted: {page_count} pages, {length} characters", "SUCCESS")
+            return markdown
 
         except Exception as e:
             self.print_status(f"PDF conversion failed: {e}", "ERROR")
             raise
 
+    def _assemble_pdf_markdown(self, page_texts) -> tuple[str, int, int]:
+        """Build page-sectioned markdown, stopping once well past the context limit"""
+        # Only the first document_context_char_limit characters reach the model,
+        # so pages beyond a small margin are never extracted.
+        stop_at = int(self.document_context_char_limit * 1.1)
+        buffer = io.StringIO()
+        written = 0
+        page_count = 0
+
+        for page_count, page_text in enumerate(page_texts, 1):
+            # Normalized text never has surrounding whitespace, so sections are
+            # only separated (not terminated) and the result needs no strip()
+            normalized = self._normalize_pdf_text(page_text)
+            if not normalized:
+                continue
+            separator = "\n\n" if written else ""
+            section = f"{separator}## Page {page_count}\n\n{normalized}"
+            buffer.write(section)
+            written += len(section)
+            if written >= stop_at:
+                self.print_status(
+                    f"Stopped extraction after page {page_count}; remaining pages exceed the context limit",
+                    "WARNING",
+                )
+                break
+
+        return buffer.getvalue(), page_count, written
+
+    def _iter_pdf_pages(self, file_path: str, use_pdfium: bool):
+        """Pick serial or process-pool extraction depending on document size"""
+        # Open once: the page count comes from the same handle the serial path reads
+        if use_pdfium:
+            import pypdfium2 as pdfium
+            document = pdfium.PdfDocument(file_path)
+            page_count = len(document)
+        else:
+            import PyPDF2
+            document = PyPDF2.PdfReader(file_path)
+            page_count = len(document.pages)
+
+        # Small documents finish faster than the pool can start
+        if self.pdf_extract_workers > 1 and page_count >= self.pdf_parallel_min_pages:
+            if use_pdfium:
+                document.close()
+            return self._iter_pdf_pages_parallel(file_path, page_count, use_pdfium)
+
+        if use_pdfium:
+            return self._iter_pdf_pages_pdfium(document)
+        return self._iter_pdf_pages_pypdf2(document)
+
+    def _iter_pdf_pages_parallel(self, file_path: str, page_count: int, use_pdfium: bool):
+        """Yield per-page text in order while worker processes extract ahead"""
+        workers = min(self.pdf_extract_workers, page_count)
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_pdf_worker,
+            initargs=(file_path, use_pdfium),
+        )
+        try:
+            yield from executor.map(
+                _extract_page,
+                range(page_count),
+                chunksize=max(1, page_count // (workers * 4)),
+            )
+        finally:
+            # Drop pages not yet started if assembly stopped early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _iter_pdf_pages_pdfium(self, pdf):
+        """Yield per-page text from an open PDFium document (much faster than PyPDF2 on large files)"""
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_range()
+                finally:
+                    # Release native memory as we go instead of at garbage collection
+                    textpage.close()
+                    page.close()
+                yield text
+        finally:
+            pdf.close()
+
+    def _iter_pdf_pages_pypdf2(self, pdf_reader):
+        """Yield per-page text from an open PyPDF2 reader"""
+        for page in pdf_reader.pages:
+            yield page.extract_text() or ""
+
     def convert_docx_to_markdown(self, file_path: str) -> str:
         """Convert DOCX to markdown format"""
         if not DOCX_AVAILABLE:
             raise ImportError("python-docx not available for DOCX processing")
 
         self.print_status("Converting DOCX to markdown...", "PROCESSING")
-        markdown_sections = []
+        # Blocks are written with their separators in front, so the output has no
+        # leading/trailing whitespace to strip and its length is tracked as we go
+        buffer = io.StringIO()
+        length = 0
 
         try:
+            from docx import Document
+            from docx.table import Table
             doc = Document(file_path)
 
-            for para_num, paragraph in enumerate(doc.paragraphs, 1):
-                text = paragraph.text.strip()
-                if text:
+            # Single pass over the body so tables stay where they appear in the document
+            paragraph_count = 0
+            table_count = 0
+            for block in self._iter_docx_blocks(doc):
+                if isinstance(block, Table):
+                    table_count += 1
+                    rows = "\n".join(
+                        "| " + " | ".join([cell.text.strip() for cell in row.cells]) + " |"
+                        for row in block.rows
+                    )
+                    separator = "\n\n\n" if length else ""
+                    chunk = f"{separator}## Table {table_count}\n\n{rows}"
+                else:
+                    paragraph_count += 1
+                    text = block.text.strip()
+                    if not text:
+                        continue
                     # Check if it's a heading (basic detection)
-                    if paragraph.style.name.startswith('Heading'):
-                        level = min(int(paragraph.style.name.split()[-1]), 6)
-                        markdown_sections.append(f"{'#' * level} {text}\n")
-                    else:
-                        markdown_sections.append(f"{text}\n")
-
-            # Process tables
-            for table_num, table in enumerate(doc.tables, 1):
-                markdown_sections.append(f"\n## Table {table_num}\n")
-                for row in table.rows:
-                    row_text = " | ".join([cell.text.strip() for cell in row.cells])
-                    markdown_sections.append(f"| {row_text} |")
-                markdown_sections.append("")
-
-            markdown = '\n'.join(markdown_sections).strip()
-
-            if not markdown:
+                    if block.style.name.startswith('Heading'):
+                        level = min(int(block.style.name.split()[-1]), 6)
+                        text = f"{'#' * level} {text}"
+                    separator = "\n\n" if length else ""
+                    chunk = f"{separator}{text}"
+                buffer.write(chunk)
+                length += len(chunk)
+
+            if not length:
                 raise ValueError("No extractable text found in DOCX")
 
-            self.print_status(f"DOCX converted: {len(doc.paragraphs)} paragraphs, {len(markdown)} characters", "SUCCESS")
+            markdown = buffer.getvalue()
+            self.print_status(f"DOCX converted: {paragraph_count} paragraphs, {length} characters", "SUCCESS")
             return markdown
 
         except Exception as e:
             self.print_status(f"DOCX conversion failed: {e}", "ERROR")
             raise
 
-    def _normalize_pdf_text(self, text: str) -> str:
-        """Normalize extracted PDF text"""
-        import re
-
-        # Split into lines and clean
-        lines = text.split('\n')
-        markdown_lines = []
-
-        for line in lines:
-            # Remove excessive whitespace
-            cleaned = ' '.join(line.split())
-
-            # Skip empty lines
-            if not cleaned:
-                continue
+    def _iter_docx_blocks(self, doc):
+        """Yield the body's paragraphs and tables in document order"""
+        if hasattr(doc, "iter_inner_content"):  # python-docx >= 1.1
+            yield from doc.iter_inner_content()
+            return
 
-            # Basic heading detection (all caps, short lines)
-            if len(cleaned) < 100 and cleaned.isupper() and len(cleaned.split()) <= 10:
-                markdown_lines.append(f"### {cleaned.title()}")
-            else:
-                markdown_lines.append(cleaned)
+        from docx.oxml.ns import qn
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
 
-        # Join with proper spacing
-        result = '\n\n'.join(markdown_lines)
+        paragraph_tag, table_tag = qn('w:p'), qn('w:tbl')
+        for child in doc.element.body.iterchildren():
+            if child.tag == paragraph_tag:
+                yield Paragraph(child, doc)
+            elif child.tag == table_tag:
+                yield Table(child, doc)
 
-        # Clean up excessive newlines
-        result = re.sub(r'\n{3,}', '\n\n', result)
+    def _normalize_pdf_text(self, text: str) -> str:
+        """Normalize extracted PDF text"""
+        # Collapse whitespace for the whole page in one pass, then clean lines
+        lines = _WS.sub(' ', text).split('\n')
+        markdown_lines = [
+            # Basic heading detection (all caps, short lines, at most 10 words)
+            f"### {cleaned.title()}"
+            if len(cleaned) < 100 and cleaned.isupper() and cleaned.count(' ') <= 9
+            else cleaned
+            for cleaned in (line.strip() for line in lines)
+            if cleaned
+        ]
 
-        return result
+        # Join with proper spacing and clean up excessive newlines
+        return _MULTI_NL.sub('\n\n', '\n\n'.join(markdown_lines))
 
-    def convert_document_to_markdown(self, file_path: str) -> tuple[str, dict]:
+    def convert_document_to_markdown(
+        self,
+        file_path: str,
+        use_cache: bool = True,
+        timestamp: Optional[str] = None,
+    ) -> tuple[str, dict]:
         """Convert document to markdown and return content + stats"""
         file_path = Path(file_path)
 
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
+        # Reruns on an unchanged file reuse the previous conversion. The context
+        # limit is part of the key because PDF extraction stops early based on it.
+        file_stat = file_path.stat()
+        cache_key = f"{file_stat.st_mtime_ns}_{file_stat.st_size}_{self.document_context_char_limit}"
+        markdown_file = self.markdown_dir / f"{file_path.stem}.{cache_key}.md"
+        stats_file = markdown_file.with_suffix('.json')
+
+        if use_cache and markdown_file.exists() and stats_file.exists():
+            try:
+                markdown = markdown_file.read_text(encoding='utf-8')
+                stats = json.loads(stats_file.read_text(encoding='utf-8'))
+                self.print_status(f"Using cached markdown: {markdown_file}", "SUCCESS")
+                return markdown, stats
+            except (OSError, ValueError) as e:
+                self.print_status(f"Ignoring unreadable markdown cache: {e}", "WARNING")
+
         # Detect file type and convert
         suffix = file_path.suffix.lower()
 
@@ -219,16 +448,17 @@ class TestEvaluator:
         stats = {
             "file_name": file_path.name,
             "file_type": suffix,
-            "file_size_bytes": file_path.stat().st_size,
+            "file_size_bytes": file_stat.st_size,
             "markdown_length": len(markdown),
-            "word_count": len(markdown.split()),
-            "line_count": len(markdown.split('\n')),
-            "conversion_timestamp": datetime.now().isoformat()
+            # Count without materialising word/line lists of a multi-MB string
+            "word_count": sum(1 for _ in _WORD.finditer(markdown)),
+            "line_count": markdown.count('\n') + 1,
+            "conversion_timestamp": timestamp or datetime.now().isoformat()
         }
 
-        # Save markdown to file
-        markdown_file = self.markdown_dir / f"{file_path.stem}.md"
+        # Save markdown to file; the stats sidecar completes the cache entry
         markdown_file.write_text(markdown, encoding='utf-8')
+        stats_file.write_text(json.dumps(stats, indent=2), encoding='utf-8')
         self.print_status(f"Markdown saved to: {markdown_file}", "SUCCESS")
 
         return markdown, stats
@@ -238,8 +468,9 @@ class TestEvaluator:
         requirements_file = self.base_dir / "requirements_test.json"
 
         try:
-            with open(requirements_file, 'r') as f:
-                requirements = json.load(f)
+            cached = _load_requirements(str(requirements_file), requirements_file.stat().st_mtime_ns)
+            # Copy each dict so callers cannot mutate the shared cached entries
+            requirements = [dict(requirement) for requirement in cached]
 
             self.print_status(f"Loaded {len(requirements)} test requirements", "SUCCESS")
             return requirements
@@ -248,7 +479,12 @@ class TestEvaluator:
             self.print_status(f"Failed to load requirements: {e}", "ERROR")
             raise
 
-    def evaluate_single_requirement(self, document_markdown: str, requirement: Dict) -> Dict:
+    def evaluate_single_requirement(
+        self,
+        document_markdown: str,
+        requirement: Dict,
+        system_prompt: Optional[str] = None,
+    ) -> Dict:
         """Evaluate a single requirement against the document"""
         if not OPENAI_AVAILABLE or not self.client:
             self.print_status("OpenAI not available - skipping evaluation", "WARNING")
@@ -264,52 +500,24 @@ class TestEvaluator:
                 "evaluation_duration_ms": 0
             }
 
-        start_time = time.time()
-
-        # Truncate document if too long
-        context_snippet = document_markdown[:self.document_context_char_limit]
-        if len(document_markdown) > self.document_context_char_limit:
-            self.print_status(f"Document truncated to {self.document_context_char_limit} characters", "WARNING")
-
-        # Build evaluation prompt
-        prompt = f"""You are an ISO 14971:2019 compliance auditor. Review the markdown context below first. If visuals or formatting details are unclear, you may rely on the original document as needed when forming your judgement.
+        from evaluation_schema import RequirementEvaluationSchema
 
-MANDATORY METHOD:
-1. Examine each acceptance criterion individually and explain in your rationale whether it is satisfied.
-2. Provide explicit evidence with page or section references (e.g., "Page 4: ...").
-3. Output PASS when every criterion is clearly satisfied with cited evidence. Use FAIL when evidence is clearly missing or contradictory. Reserve FLAGGED for cases where evidence is partial or genuinely uncertain.
-4. Before finalising, confirm that the chosen status (PASS / FAIL / FLAGGED) best reflects the evidence; do not default to FLAGGED when the evidence clearly supports PASS or FAIL.
-
-MARKDOWN CONTEXT (truncated to {self.document_context_char_limit} chars):
-{context_snippet}
+        start_time = time.time()
 
-REQUIREMENT DETAILS:
-- ID: {requirement['id']}
-- Clause: {requirement['clause']}
-- Title: {requirement['title']}
-- Requirement Text: {requirement['requirement_text']}
-- Acceptance Criteria: {requirement['acceptance_criteria']}
-- Expected Artifacts: {requirement.get('expected_artifacts', 'Not specified')}
+        if system_prompt is None:
+            system_prompt = self.build_system_prompt(document_markdown)
 
-Respond with JSON only:
-{{
-    "status": "PASS|FAIL|FLAGGED|NOT_APPLICABLE",
-    "confidence": "low|medium|high",
-    "rationale": "Explain satisfied/unsatisfied criteria with citations",
-    "evidence": ["Page/Section citation with quote", ...],
-    "gaps": ["Gap 1", ...],
-    "recommendations": ["Next action", ...]
-}}
-Confidence level guidelines:
-- Use "high" when evidence is explicit, comprehensive, and directly addresses all criteria
-- Use "medium" when evidence is present but incomplete, requires some inference, or has minor gaps
-- Use "low" when evidence is sparse, ambiguous, uncertain, or requires significant assumptions"""
+        # Only this part varies between requirements
+        prompt = (
+            f"REQUIREMENT DETAILS:\n{self._format_requirement(requirement)}\n\n"
+            f"{self.RESPONSE_FORMAT}"
+        )
 
         self.print_status(f"Evaluating requirement {requirement['id']}...", "PROCESSING")
 
         # Save prompt for debugging
-        prompt_file = self.results_dir / f"prompt_{requirement['id'].replace('-', '_')}.txt"
-        prompt_file.write_text(prompt, encoding='utf-8')
+        if self.debug:
+            self._write_debug_file(f"prompt_{requirement['_id_safe']}.txt", f"{system_prompt}\n\n{prompt}")
 
         try:
             # Some models like gpt-5-mini don't support custom temperature
@@ -319,20 +527,18 @@ Confidence level guidelines:
             response = self.client.responses.parse(
                 model=self.model,
                 reasoning={"effort": self.reasoning_effort},
-                input=[{
-                    "role": "user",
-                    "content": [{"type": "input_text", "text": prompt}]
-                }],
+                input=self._build_input(system_prompt, prompt),
                 text_format=RequirementEvaluationSchema,
             )
 
             tokens_used = getattr(getattr(response, "usage", None), "total_tokens", 0)
 
             # Save raw response
-            response_file = self.results_dir / f"response_{requirement['id'].replace('-', '_')}.txt"
+            response_name = f"response_{requirement['_id_safe']}.txt"
             parsed_model = getattr(response, "output_parsed", None)
             if parsed_model is None:
-                response_file.write_text("", encoding='utf-8')
+                if self.debug:
+                    self._write_debug_file(response_name, "")
                 return {
                     "requirement_id": requirement['id'],
                     "status": "ERROR",
@@ -349,8 +555,9 @@ Confidence level guidelines:
             parsed['requirement_id'] = requirement['id']
             parsed['tokens_used'] = tokens_used
             parsed['evaluation_duration_ms'] = int((time.time() - start_time) * 1000)
-            raw_text = getattr(response, "output_text", None) or json.dumps(parsed, indent=2)
-            response_file.write_text(raw_text, encoding='utf-8')
+            if self.debug:
+                raw_text = getattr(response, "output_text", None) or json.dumps(parsed, indent=2)
+                self._write_debug_file(response_name, raw_text)
 
             # Display categorical confidence level
             confidence_display = str(parsed.get('confidence', 'low')).upper()
@@ -374,10 +581,204 @@ Confidence level guidelines:
                 "evaluation_duration_ms": int((time.time() - start_time) * 1000)
             }
 
-    def generate_summary_report(self, document_stats: dict, results: List[Dict]) -> Dict:
+    def evaluate_requirements_batch(
+        self,
+        document_markdown: str,
+        requirements: List[Dict],
+        system_prompt: Optional[str] = None,
+    ) -> List[Dict]:
+        """Evaluate several requirements in one call so the document context is sent once"""
+        if not requirements:
+            return []
+        if not OPENAI_AVAILABLE or not self.client:
+            return [self.evaluate_single_requirement(document_markdown, requirement) for requirement in requirements]
+
+        from evaluation_schema import BatchEvaluation
+
+        start_time = time.time()
+
+        if system_prompt is None:
+            system_prompt = self.build_system_prompt(document_markdown)
+
+        requirement_blocks = "\n\n".join(
+            f"REQUIREMENT {index}:\n{self._format_requirement(requirement)}"
+            for index, requirement in enumerate(requirements, 1)
+        )
+        prompt = (
+            f"REQUIREMENTS TO EVALUATE ({len(requirements)}):\n\n{requirement_blocks}\n\n"
+            f"{self.BATCH_RESPONSE_FORMAT}"
+        )
+
+        self.print_status(f"Evaluating {len(requirements)} requirements in one batched call...", "PROCESSING")
+
+        # Save prompt for debugging
+        if self.debug:
+            self._write_debug_file("prompt_batch.txt", f"{system_prompt}\n\n{prompt}")
+
+        try:
+            response = self.client.responses.parse(
+                model=self.model,
+                reasoning={"effort": self.reasoning_effort},
+                input=self._build_input(system_prompt, prompt),
+                text_format=BatchEvaluation,
+            )
+        except Exception as e:
+            self.print_status(f"API call failed: {e}", "ERROR")
+            duration_ms = int((time.time() - start_time) * 1000)
+            return [
+                {
+                    "requirement_id": requirement['id'],
+                    "status": "ERROR",
+                    "confidence": "low",  # Categorical string confidence
+                    "rationale": f"API error: {e}",
+                    "evidence": [],
+                    "gaps": ["API call failed"],
+                    "recommendations": ["Check API configuration"],
+                    "tokens_used": 0,
+                    "evaluation_duration_ms": duration_ms // len(requirements),
+                }
+                for requirement in requirements
+            ]
+
+        tokens_used = getattr(getattr(response, "usage", None), "total_tokens", 0) or 0
+        duration_ms = int((time.time() - start_time) * 1000)
+
+        parsed_model = getattr(response, "output_parsed", None)
+        if self.debug:
+            raw_text = getattr(response, "output_text", None)
+            if not raw_text and parsed_model is not None:
+                raw_text = parsed_model.model_dump_json(indent=2)
+            self._write_debug_file("response_batch.txt", raw_text or "")
+
+        parsed_by_id: Dict[str, Dict] = {}
+        for item in getattr(parsed_model, "results", None) or []:
+            parsed_by_id.setdefault(item.requirement_id, item.model_dump())
+
+        # The call is shared, so split its tokens and duration evenly (totals are preserved)
+        count = len(requirements)
+        token_share, token_rest = divmod(tokens_used, count)
+        duration_share, duration_rest = divmod(duration_ms, count)
+
+        results = []
+        for index, requirement in enumerate(requirements):
+            # Copy so duplicate requirement IDs each keep their own token/duration share
+            parsed = dict(parsed_by_id.get(requirement['id']) or {})
+            if not parsed:
+                parsed = {
+                    "requirement_id": requirement['id'],
+                    "status": "ERROR",
+                    "confidence": "low",  # Categorical string confidence
+                    "rationale": "Requirement missing from batched model response",
+                    "evidence": [],
+                    "gaps": ["Model response missing structured payload"],
+                    "recommendations": ["Retry evaluation"],
+                }
+            parsed['tokens_used'] = token_share + (1 if index < token_rest else 0)
+            parsed['evaluation_duration_ms'] = duration_share + (1 if index < duration_rest else 0)
+            results.append(parsed)
+
+        completed = sum(1 for result in results if result['status'] != "ERROR")
+        self.print_status(f"Batched evaluation complete: {completed}/{count} requirements evaluated", "SUCCESS")
+        return results
+
+    def _evaluate_requirements_parallel(
+        self,
+        markdown: str,
+        requirements: List[Dict],
+        system_prompt: Optional[str] = None,
+    ) -> List[Dict]:
+        """Evaluate requirements one call each, overlapping the calls in a thread pool"""
+        results: List[Optional[Dict]] = [None] * len(requirements)
+
+        # The API calls are I/O-bound, so overlap them and keep results in requirement order
+        max_workers = max(1, min(self.eval_concurrency, len(requirements)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for i, requirement in enumerate(requirements):
+                with self._print_lock:
+                    print(f"\n{Fore.CYAN}[{i + 1}/{len(requirements)}] {requirement['title']}{Style.RESET_ALL}")
+                futures[executor.submit(self.evaluate_single_requirement, markdown, requirement, system_prompt)] = i
+
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+        return results
+
+    def _write_debug_file(self, name: str, text: str) -> None:
+        (self.results_dir / name).write_text(text, encoding='utf-8')
+
+    def build_system_prompt(self, document_markdown: str) -> str:
+        """Build the document-wide prompt prefix shared by every requirement call"""
+        context_snippet, limit_label = self._truncate_context(document_markdown)
+
+        return (
+            f"{self.EVALUATION_INSTRUCTIONS}\n\n"
+            f"{self.CONFIDENCE_GUIDELINES}\n\n"
+            f"MARKDOWN CONTEXT (truncated to {limit_label}):\n"
+            f"{context_snippet}"
+        )
+
+    def _truncate_context(self, document_markdown: str) -> tuple[str, str]:
+        """Cut the document to the context budget; token budgets end on a section boundary"""
+        if self.document_context_token_limit > 0 and TIKTOKEN_AVAILABLE:
+            if self._encoding is None:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    # Newer models may not be registered in the installed tiktoken yet
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+            limit_label = f"{self.document_context_token_limit} tokens"
+            token_ids = self._encoding.encode(document_markdown)
+            if len(token_ids) <= self.document_context_token_limit:
+                return document_markdown, limit_label
+            snippet = self._encoding.decode(token_ids[:self.document_context_token_limit])
+
+            # Snap back to the last page/section heading so a page is not split,
+            # unless that would throw away more than half of the budget.
+            boundary = snippet.rfind("\n## ")
+            if boundary > len(snippet) // 2:
+                snippet = snippet[:boundary]
+
+            self.print_status(f"Document truncated to {limit_label} ({len(snippet)} characters)", "WARNING")
+            return snippet, limit_label
+
+        if self.document_context_token_limit > 0:
+            self.print_status("tiktoken not installed - using DOCUMENT_CONTEXT_CHAR_LIMIT", "WARNING")
+        limit_label = f"{self.document_context_char_limit} chars"
+        if len(document_markdown) > self.document_context_char_limit:
+            self.print_status(f"Document truncated to {self.document_context_char_limit} characters", "WARNING")
+        return document_markdown[:self.document_context_char_limit], limit_label
+
+    def _build_input(self, system_prompt: str, prompt: str) -> List[Dict]:
+        # The system message is byte-identical for the whole run, so OpenAI's
+        # prompt caching can reuse it; only the user message changes per call.
+        return [
+            {"role": "system", "content": [{"type": "input_text", "text": system_prompt}]},
+            {"role": "user", "content": [{"type": "input_text", "text": prompt}]},
+        ]
+
+    def _format_requirement(self, requirement: Dict) -> str:
+        """Render the requirement fields shown to the model"""
+        return (
+            f"- ID: {requirement['id']}\n"
+            f"- Clause: {requirement['clause']}\n"
+            f"- Title: {requirement['title']}\n"
+            f"- Requirement Text: {requirement['requirement_text']}\n"
+            f"- Acceptance Criteria: {requirement['acceptance_criteria']}\n"
+            f"- Expected Artifacts: {requirement.get('expected_artifacts', 'Not specified')}"
+        )
+
+    def generate_summary_report(
+        self,
+        document_stats: dict,
+        results: List[Dict],
+        generated_at: Optional[str] = None,
+    ) -> Dict:
         """Generate summary report"""
         total_requirements = len(results)
 
+        # Fixed buckets first so the report always lists them in this order
         status_counts = {
             "PASS": 0,
             "FAIL": 0,
@@ -386,15 +787,10 @@ Confidence level guidelines:
             "ERROR": 0,
             "SKIPPED": 0
         }
+        status_counts.update(Counter(result.get('status', 'ERROR') for result in results))
 
-        total_tokens = 0
-        total_duration = 0
-
-        for result in results:
-            status = result.get('status', 'ERROR')
-            status_counts[status] = status_counts.get(status, 0) + 1
-            total_tokens += result.get('tokens_used', 0)
-            total_duration += result.get('evaluation_duration_ms', 0)
+        total_tokens = sum(result.get('tokens_used', 0) for result in results)
+        total_duration = sum(result.get('evaluation_duration_ms', 0) for result in results)
 
         # Calculate compliance score
         scored_requirements = total_requirements - status_counts['ERROR'] - status_counts['SKIPPED']
@@ -416,7 +812,7 @@ Confidence level guidelines:
                 "estimated_cost_usd": round(estimated_cost, 4)
             },
             "requirements_results": results,
-            "generated_at": datetime.now().isoformat()
+            "generated_at": generated_at or datetime.now().isoformat()
         }
 
         return summary
@@ -442,6 +838,8 @@ Confidence level guidelines:
             return
 
         # Use tabulate for nice formatting
+        from tabulate import tabulate
+
         table_data = []
         for result in results:
             confidence_str = str(result.get('confidence', 'low')).upper()
@@ -457,13 +855,20 @@ Confidence level guidelines:
         print(f"\n{Fore.CYAN}EVALUATION RESULTS{Style.RESET_ALL}")
         print(tabulate(table_data, headers=headers, tablefmt="grid"))
 
-    def run_evaluation(self, file_path: str) -> Dict:
+    def run_evaluation(self, file_path: str, use_cache: bool = True) -> Dict:
         """Run complete evaluation process"""
         self.print_header("ISO 14971 Test Evaluator", Fore.CYAN)
 
+        # One clock reading per run keeps stats, summary, and file names consistent
+        now = datetime.now()
+        run_iso = now.isoformat()
+        run_stamp = now.strftime('%Y%m%d_%H%M%S')
+
         # Step 1: Convert document to markdown
         self.print_header("Step 1: Document Processing", Fore.BLUE)
-        markdown, document_stats = self.convert_document_to_markdown(file_path)
+        markdown, document_stats = self.convert_document_to_markdown(
+            file_path, use_cache=use_cache, timestamp=run_iso
+        )
 
         # Print markdown preview
         print(f"{Fore.YELLOW}Markdown Preview (first 500 chars):{Style.RESET_ALL}")
@@ -477,16 +882,16 @@ Confidence level guidelines:
 
         # Step 3: Run evaluations
         self.print_header("Step 3: Running Evaluations", Fore.BLUE)
-        results = []
-
-        for i, requirement in enumerate(requirements, 1):
-            print(f"\n{Fore.CYAN}[{i}/{len(requirements)}] {requirement['title']}{Style.RESET_ALL}")
-            result = self.evaluate_single_requirement(markdown, requirement)
-            results.append(result)
+        # Built once so every call shares a byte-identical, cacheable prefix
+        system_prompt = self.build_system_prompt(markdown)
+        if 0 < len(requirements) <= self.batch_max_requirements:
+            results = self.evaluate_requirements_batch(markdown, requirements, system_prompt)
+        else:
+            results = self._evaluate_requirements_parallel(markdown, requirements, system_prompt)
 
         # Step 4: Generate summary
         self.print_header("Step 4: Summary Report", Fore.BLUE)
-        summary = self.generate_summary_report(document_stats, results)
+        summary = self.generate_summary_report(document_stats, results, generated_at=run_iso)
 
         # Print results table
         self.print_results_table(results)
@@ -501,72 +906,71 @@ Confidence level guidelines:
         print(f"Total Duration: {eval_summary['total_duration_ms']/1000:.1f} seconds")
 
         # Save complete results
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        results_file = self.results_dir / f"evaluation_{timestamp}.json"
-        with open(results_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        results_file = self.results_dir / f"evaluation_{run_stamp}.json"
+        self._write_results_json(summary, results_file)
 
         self.print_status(f"Complete results saved to: {results_file}", "SUCCESS")
 
         # Save Excel summary
-        excel_file = self.results_dir / f"evaluation_{timestamp}.xlsx"
+        excel_file = self.results_dir / f"evaluation_{run_stamp}.xlsx"
         self.export_results_to_excel(summary, excel_file)
         self.print_status(f"Excel report saved to: {excel_file}", "SUCCESS")
 
         return summary
 
+    def _write_results_json(self, summary: Dict, results_file: Path) -> None:
+        """Write the summary as indented JSON, using orjson when installed"""
+        if ORJSON_AVAILABLE:
+            import orjson
+            results_file.write_bytes(orjson.dumps(summary, default=str, option=orjson.OPT_INDENT_2))
+            return
+        with open(results_file, 'w') as f:
+            json.dump(summary, f, indent=2, default=str)
+
     def _extract_response_text(self, response) -> str:
-        try:
-            output = getattr(response, "output", None)
-            if not output:
-                return ""
-            parts: List[str] = []
-            for item in output:
-                content = getattr(item, "content", None)
-                if not content:
-                    continue
-                for chunk in content:
-                    chunk_type = getattr(chunk, "type", None)
-                    if chunk_type in {"output_text", "text"}:
-                        parts.append(getattr(chunk, "text", ""))
-            return "\n".join(filter(None, parts))
-        except AttributeError:
-            return ""
+        # Fallback only: structured calls read output_parsed/output_text directly.
+        # Reasoning items carry no content, hence the `or ()` guards.
+        return "\n".join(
+            chunk.text
+            for item in (getattr(response, "output", None) or ())
+            for chunk in (getattr(item, "content", None) or ())
+            if getattr(chunk, "type", None) in ("output_text", "text") and getattr(chunk, "text", None)
+        )
 
     def export_results_to_excel(self, summary: Dict, excel_path: Path) -> Path:
         """Export evaluation summary and requirement details to an Excel workbook."""
-        workbook = Workbook()
+        from excel_export import write_workbook
 
-        # Summary sheet
-        summary_sheet = workbook.active
-        summary_sheet.title = "Summary"
+        write_workbook(excel_path, [
+            ("Summary", self._summary_rows(summary)),
+            ("Requirements", self._requirement_rows(summary)),
+        ])
+        return excel_path
 
+    def _summary_rows(self, summary: Dict) -> Iterator[List]:
         document_info = summary.get('document_info', {})
         evaluation_summary = summary.get('evaluation_summary', {})
 
-        summary_sheet.append(["Field", "Value"])
+        yield ["Field", "Value"]
         for key, value in document_info.items():
-            summary_sheet.append([key.replace('_', ' ').title(), value])
+            yield [key.replace('_', ' ').title(), value]
 
-        summary_sheet.append([])
-        summary_sheet.append(["Metric", "Value"])
+        yield []
+        yield ["Metric", "Value"]
         for key, value in evaluation_summary.items():
             if key == 'status_counts':
                 continue
-            summary_sheet.append([key.replace('_', ' ').title(), value])
+            yield [key.replace('_', ' ').title(), value]
 
         status_counts = evaluation_summary.get('status_counts', {})
         if status_counts:
-            summary_sheet.append([])
-            summary_sheet.append(["Status", "Count"])
+            yield []
+            yield ["Status", "Count"]
             for status, count in status_counts.items():
-                summary_sheet.append([status, count])
-
-        self._auto_size_columns(summary_sheet)
+                yield [status, count]
 
-        # Requirements sheet
-        requirements_sheet = workbook.create_sheet(title="Requirements")
-        headers = [
+    def _requirement_rows(self, summary: Dict) -> Iterator[List]:
+        yield [
             "Requirement ID",
             "Status",
             "Confidence",
@@ -577,7 +981,6 @@ Confidence level guidelines:
             "Tokens Used",
             "Duration (ms)"
         ]
-        requirements_sheet.append(headers)
 
         for requirement in summary.get('requirements_results', []):
             evidence = '\n'.join(requirement.get('evidence', []))
@@ -591,7 +994,7 @@ Confidence level guidelines:
                 confidence_str = "low"
             confidence_label = confidence_str.upper()
 
-            requirements_sheet.append([
+            yield [
                 requirement.get('requirement_id'),
                 requirement.get('status'),
                 confidence_label,
@@ -601,31 +1004,20 @@ Confidence level guidelines:
                 recommendations,
                 requirement.get('tokens_used', 0),
                 requirement.get('evaluation_duration_ms', 0)
-            ])
-
-        self._auto_size_columns(requirements_sheet)
-
-        workbook.save(excel_path)
-        return excel_path
-
-    def _auto_size_columns(self, worksheet) -> None:
-        """Automatically size worksheet columns based on content length."""
-        for column_cells in worksheet.columns:
-            length = max(len(str(cell.value or "")) for cell in column_cells)
-            adjusted_width = min(length + 2, 80)
-            worksheet.column_dimensions[get_column_letter(column_cells[0].column)].width = adjusted_width
-
+            ]
 
 def main():
     parser = argparse.ArgumentParser(description="ISO 14971 Test Evaluator")
     parser.add_argument("file_path", help="Path to PDF or DOCX file to evaluate")
     parser.add_argument("--api-key", help="OpenAI API key (or set OPENAI_API_KEY env var)")
+    parser.add_argument("--debug", action="store_true", help="Save prompts and raw responses to the results directory")
+    parser.add_argument("--no-cache", action="store_true", help="Re-convert the document even if cached markdown exists")
 
     args = parser.parse_args()
 
     try:
-        evaluator = TestEvaluator(openai_api_key=args.api_key)
-        results = evaluator.run_evaluation(args.file_path)
+        evaluator = TestEvaluator(openai_api_key=args.api_key, debug=args.debug)
+        results = evaluator.run_evaluation(args.file_path, use_cache=not args.no_cache)
 
         print(f"\n{Fore.GREEN}✓ Evaluation completed successfully!{Style.RESET_ALL}")
 
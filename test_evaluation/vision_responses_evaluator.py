@@ -12,25 +12,39 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import functools
 import hashlib
+import importlib.util
 import json
 import logging
 import os
+import random
+import re
+import sqlite3
+import time
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
 load_dotenv()
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-
 from evaluation_schema import RequirementEvaluationSchema
+from excel_export import write_workbook
+from file_hashing import sha256_file
+from response_writer import response_writer
 
+import httpx
 import openai
-from openai import OpenAI
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
 
 try:
     from google import genai
@@ -51,6 +65,52 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Requirement IDs such as "4.1-a" become "4.1_a" in raw response filenames
+_ID_FILENAME_TABLE = str.maketrans("-", "_")
+# httpx only negotiates HTTP/2 when the optional h2 package is installed
+H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# PostgREST caps rows per response, so full snapshots are fetched in pages
+SUPABASE_PAGE_SIZE = 1000
+
+# Retry policy for transient OpenAI failures (429s, timeouts, 5xx)
+MAX_API_ATTEMPTS = 6
+MAX_RETRY_DELAY_SECONDS = 30.0
+RETRYABLE_OPENAI_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+# Matches the parts of rate-limit reset headers such as "6m0s" or "250ms"
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+_BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# A cancelled batch only publishes its partial output file once it reaches "cancelled"
+BATCH_CANCEL_WAIT_SECONDS = 600.0
+BATCH_CANCEL_POLL_SECONDS = 10.0
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse retry-after seconds ("2") or reset durations ("6m0s", "250ms") into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def _is_quota_error(exc: Exception) -> bool:
+    """True for 429s caused by an exhausted quota, which no amount of waiting fixes."""
+    if not isinstance(exc, RateLimitError):
+        return False
+    code = getattr(exc, "code", None)
+    body = getattr(exc, "body", None)
+    if not code and isinstance(body, dict):
+        code = body.get("code") or (body.get("error") or {}).get("code")
+    return code == "insufficient_quota"
+
 
 class VisionResponsesEvaluator:
     """Evaluate ISO requirements using gpt-5-mini with attached PDF file."""
@@ -79,6 +139,27 @@ Vision handling:
 - Use both text and visual content. When graphs appear, read axis titles/units and summarise trends. When tables appear, read cells and preserve structure. If text appears in an image, transcribe it before reasoning. If something is unreadable, write "[unreadable]" and move on.
 """.strip()
 
+    METHOD_INSTRUCTION = (
+        "MANDATORY METHOD:\n"
+        "1. Review the attached PDF for visuals (tables, charts, signatures) whenever the text layer is insufficient.\n"
+        "2. Evaluate ONLY the requested clause; cite page or section references for evidence. Treat clear cross-references to other SOPs/records as evidence that those processes/records exist.\n"
+        "3. Decision logic: PASS if the requirement is clearly addressed and practicable (minor OFIs allowed); FAIL if the process/records are missing or contradicted; FLAGGED when evidence is incomplete or genuinely uncertain; NOT_APPLICABLE only when the clause truly does not apply.\n"
+        "4. When in doubt between PASS and FLAGGED, choose PASS and note OFIs in the gaps/recommendations fields.\n"
+        "5. Before finalising, confirm the chosen status best matches the evidence; do not default to FLAGGED when PASS or FAIL is supported.\n"
+        "Respond strictly with JSON using this schema:\n"
+        "{\n"
+        "  \"status\": \"PASS|FAIL|FLAGGED|NOT_APPLICABLE\",\n"
+        "  \"confidence\": \"low|medium|high\",\n"
+        "  \"rationale\": \"Explain satisfied/unsatisfied criteria with citations\",\n"
+        "  \"evidence\": [\"Page/Section citation with quote\", ...],\n"
+        "  \"gaps\": [string],\n"
+        "  \"recommendations\": [string]\n"
+        "}\n"
+        "Use \"high\" confidence only when evidence is explicit and comprehensive, "
+        "\"medium\" when evidence is mixed but leans toward your status, and "
+        "\"low\" when evidence is sparse or uncertain.\n"
+    )
+
     def __init__(
         self,
         *,
@@ -86,13 +167,15 @@ Vision handling:
         gemini_api_key: Optional[str] = None,
         model: Optional[str] = None,
         provider: Optional[str] = None,
+        batch: Optional[bool] = None,
     ) -> None:
         self.provider = (provider or os.getenv("VISION_PROVIDER") or "openai").strip().lower()
         if self.provider not in {"openai", "gemini"}:
             raise RuntimeError(f"Unsupported VISION_PROVIDER '{self.provider}'. Use 'openai' or 'gemini'.")
 
         self.model = model
-        self.openai_client: Optional[OpenAI] = None
+        self.openai_client: Optional[AsyncOpenAI] = None
+        self.http_client: Optional[httpx.AsyncClient] = None
         self.gemini_client: Optional["genai.Client"] = None
         self.gemini_response_schema = None
         self.gemini_thinking_config = None
@@ -104,6 +187,22 @@ Vision handling:
         self.concurrent_requests = int(os.getenv("VISION_EVALUATOR_CONCURRENCY", "8"))
         self.reasoning_effort = os.getenv('VISION_REASONING_EFFORT', 'medium')
         self.requirements_limit = int(os.getenv("VISION_EVALUATOR_REQUIREMENT_LIMIT", "0"))
+        self.requirements_source = (os.getenv("VISION_REQUIREMENTS_SOURCE") or "auto").strip().lower()
+        if self.requirements_source not in {"auto", "local", "supabase"}:
+            raise RuntimeError(
+                f"Unsupported VISION_REQUIREMENTS_SOURCE '{self.requirements_source}'. Use 'auto', 'local' or 'supabase'."
+            )
+        self.requirements_snapshot_ttl = float(os.getenv("VISION_REQUIREMENTS_SNAPSHOT_TTL_SECONDS", "3600"))
+        # Batch API mode (OpenAI only): half price, results within the 24h window
+        if batch is None:
+            batch = os.getenv("VISION_EVALUATOR_BATCH", "").strip().lower() in {"1", "true", "yes"}
+        self.batch_mode = batch
+        self.batch_poll_max_seconds = float(os.getenv("VISION_EVALUATOR_BATCH_POLL_MAX_SECONDS", "60"))
+        self.batch_max_wait_seconds = float(os.getenv("VISION_EVALUATOR_BATCH_MAX_WAIT_SECONDS", "86400"))
+        # Pause every worker once the token budget reported by the API drops below this
+        self.min_remaining_tokens = int(os.getenv("VISION_EVALUATOR_MIN_REMAINING_TOKENS", "20000"))
+        self._throttle_lock = asyncio.Lock()
+        self._throttle_until = 0.0
 
         if self.provider == "gemini":
             if not GENAI_AVAILABLE:
@@ -133,7 +232,23 @@ Vision handling:
                 or vision_model_override
                 or "gpt-5"
             )
-            self.openai_client = OpenAI(api_key=api_key)
+            # One pooled client sized to the concurrency so parallel calls reuse connections;
+            # the SDK's default client keeps its own timeout and redirect settings
+            self.http_client = openai.DefaultAsyncHttpxClient(
+                http2=H2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=max(100, 4 * self.concurrent_requests),
+                    max_keepalive_connections=2 * self.concurrent_requests,
+                ),
+            )
+            self.openai_client = AsyncOpenAI(api_key=api_key, http_client=self.http_client)
+            # _parse_with_retry owns retries for evaluation calls; stacking the SDK's
+            # own retries on top would multiply attempts and ignore the shared throttle
+            self._responses_client = self.openai_client.with_options(max_retries=0)
+
+        if self.batch_mode and self.provider != "openai":
+            logger.warning("Batch mode is only supported for the OpenAI provider; using direct calls")
+            self.batch_mode = False
 
         self.supabase: Optional[Client] = None
         if SUPABASE_AVAILABLE:
@@ -149,12 +264,31 @@ Vision handling:
         self.requirements_path = base_dir / "requirements_test.json"
         self.output_dir = base_dir / "output" / "vision_results"
         self.responses_dir = self.output_dir / "responses"
+        self.requirements_snapshot_path = self.output_dir / "requirements_snapshot.json"
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.responses_dir.mkdir(parents=True, exist_ok=True)
 
-        self.cache_path = self.output_dir / f"uploaded_files_cache_{self.provider}.json"
+        # Identical for every requirement so the provider can reuse its prompt cache
+        self._prompt_prefix = "\n\n".join([self.BASE_INSTRUCTION, self.METHOD_INSTRUCTION])
+
+        # One row per upload; WAL lets concurrent evaluator runs read while another writes.
+        # Queries run on the event loop thread, but the evaluator may be built on another
+        # thread than the loop's, hence check_same_thread=False. Closed in aclose().
+        self.cache_path = self.output_dir / f"uploaded_files_cache_{self.provider}.db"
+        self.legacy_cache_path = self.cache_path.with_suffix(".json")
+        self._file_cache_db = sqlite3.connect(self.cache_path, isolation_level=None, check_same_thread=False)
+        self._file_cache_db.execute("PRAGMA journal_mode=WAL")
+        self._file_cache_db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "file_hash TEXT PRIMARY KEY, meta TEXT NOT NULL, uploaded_at TEXT)"
+        )
         self.file_cache = self._load_cache()
 
+        # Opt-in cache of parsed results for unchanged (file, requirement, model, prompt)
+        self.use_response_cache = os.getenv("VISION_EVALUATOR_USE_RESPONSE_CACHE") == "1"
+        self.response_cache_path = self.output_dir / "response_cache.db"
+        self._response_cache: Optional[sqlite3.Connection] = None
+
         if self.provider == "openai":
             logger.info(
                 "VisionResponsesEvaluator initialised (provider=%s) with openai %s (%s); client=%s; model=%s; limit=%s; concurrency=%s",
@@ -177,6 +311,21 @@ Vision handling:
             )
 
 
+    async def __aenter__(self) -> "VisionResponsesEvaluator":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections and the cache database."""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+        self._file_cache_db.close()
+        if self._response_cache is not None:
+            self._response_cache.close()
+            self._response_cache = None
+
     async def evaluate_document(self, file_path: str) -> Dict:
         document_path = Path(file_path)
         if not document_path.exists():
@@ -184,13 +333,15 @@ Vision handling:
         if document_path.suffix.lower() != ".pdf":
             raise ValueError("Vision evaluator currently supports PDF files only")
 
-        file_ref, file_hash, cache_hit = await self.ensure_file_ref(document_path)
-
-        requirements = self._load_requirements()
+        # The upload and the requirements fetch are independent round-trips
+        (file_ref, file_hash, cache_hit), requirements = await asyncio.gather(
+            self.ensure_file_ref(document_path),
+            asyncio.to_thread(self._load_requirements),
+        )
 
         run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         run_responses_dir = self.responses_dir / run_id
-        run_responses_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(run_responses_dir.mkdir, parents=True, exist_ok=True)
 
         document_stats = {
             "file_name": document_path.name,
@@ -206,38 +357,87 @@ Vision handling:
             "run_id": run_id,
         }
 
-        semaphore = asyncio.Semaphore(self.concurrent_requests)
-        tasks = [
-            self._evaluate_single_requirement(file_ref, requirement, semaphore, run_responses_dir)
-            for requirement in requirements
+        document_stats["batch_mode"] = self.batch_mode
+        unique_requirements, source_index = self._dedupe_requirements(requirements)
+        document_stats["duplicate_requirements"] = len(requirements) - len(unique_requirements)
+        if self.batch_mode:
+            evaluations = await self._evaluate_requirements_batch(
+                file_ref.get("file_id", ""),
+                unique_requirements,
+                run_responses_dir,
+            )
+        else:
+            evaluations = [None] * len(unique_requirements)
+            # Acquire before creating each task so only `concurrent_requests`
+            # coroutines (and their prompts/responses) exist at any one time.
+            semaphore = asyncio.Semaphore(self.concurrent_requests)
+            async with response_writer() as write_queue:
+                async with asyncio.TaskGroup() as task_group:
+                    for index, requirement in enumerate(unique_requirements):
+                        await semaphore.acquire()
+                        task_group.create_task(
+                            self._evaluate_gated(
+                                evaluations,
+                                index,
+                                semaphore,
+                                file_ref,
+                                requirement,
+                                self._raw_response_path(run_responses_dir, requirement),
+                                write_queue,
+                                file_hash,
+                            )
+                        )
+
+        results: List[Dict] = [
+            evaluations[index]
+            if unique_requirements[index] is requirement
+            else self._restamp_result(evaluations[index], requirement)
+            for requirement, index in zip(requirements, source_index)
         ]
 
-        evaluations = await asyncio.gather(*tasks, return_exceptions=True)
-
-        results: List[Dict] = []
-        for requirement, evaluation in zip(requirements, evaluations):
-            if isinstance(evaluation, Exception):
-                results.append({
-                    "requirement_id": requirement["id"],
-                    "status": "ERROR",
-                    "confidence": "low",
-                    "rationale": str(evaluation),
-                    "evidence": [],
-                    "gaps": ["Evaluation failed"],
-                    "recommendations": ["Retry requirement"],
-                    "tokens_used": 0,
-                })
-            else:
-                results.append(evaluation)
-
         summary = self._generate_summary(document_stats, results)
         self._persist_summary(summary, run_id)
         return summary
 
+    @staticmethod
+    def _raw_response_path(run_responses_dir: Path, requirement: Dict) -> Path:
+        return run_responses_dir / f"response_{requirement['id'].translate(_ID_FILENAME_TABLE)}.txt"
+
+    def _dedupe_requirements(self, requirements: List[Dict]) -> Tuple[List[Dict], List[int]]:
+        """Collapse requirements with identical content to one evaluation each.
+
+        Returns the unique requirements and, for every original requirement, the
+        index of the unique requirement whose result it should reuse.
+        """
+        unique: List[Dict] = []
+        index_by_key: Dict[str, int] = {}
+        source_index: List[int] = []
+        for requirement in requirements:
+            # The ID is left out so a clause listed under several IDs is asked once
+            fingerprint = "\x1f".join(
+                str(requirement.get(field, ""))
+                for field in ("clause", "title", "requirement_text", "acceptance_criteria", "expected_artifacts")
+            )
+            key = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+            if key not in index_by_key:
+                index_by_key[key] = len(unique)
+                unique.append(requirement)
+            source_index.append(index_by_key[key])
+        return unique, source_index
+
+    @staticmethod
+    def _restamp_result(result: Dict, requirement: Dict) -> Dict:
+        copy = dict(result)
+        copy["requirement_id"] = requirement["id"]
+        copy["requirement_title"] = requirement.get("title")
+        copy["requirement_clause"] = requirement.get("clause")
+        # The tokens were spent once, on the requirement that was actually sent
+        copy["tokens_used"] = 0
+        return copy
+
     async def ensure_file_ref(self, document_path: Path) -> Tuple[Dict[str, str], str, bool]:
         """Upload the PDF once and cache the returned identifier per provider."""
-        data = document_path.read_bytes()
-        file_hash = hashlib.sha256(data).hexdigest()
+        file_hash = await asyncio.to_thread(sha256_file, document_path)
         cached_entry = self.file_cache.get(file_hash)
         if cached_entry and cached_entry.get("provider") == self.provider:
             return cached_entry, file_hash, True
@@ -264,12 +464,12 @@ Vision handling:
         else:
             if self.openai_client is None:
                 raise RuntimeError("OpenAI client is not configured")
-            with open(document_path, "rb") as file_obj:
-                upload = await asyncio.to_thread(
-                    self.openai_client.files.create,
-                    file=file_obj,
-                    purpose="user_data",
-                )
+            # Read off the event loop; the async client uploads the bytes natively
+            file_bytes = await asyncio.to_thread(document_path.read_bytes)
+            upload = await self.openai_client.files.create(
+                file=(document_path.name, file_bytes),
+                purpose="user_data",
+            )
 
             file_meta = {
                 "provider": "openai",
@@ -280,173 +480,492 @@ Vision handling:
             }
 
         self.file_cache[file_hash] = file_meta
-        self._save_cache()
+        self._save_cache(file_hash)
         return file_meta, file_hash, False
 
-    async def _evaluate_single_requirement(
+    async def evaluate_requirement(
         self,
         file_ref: Dict,
         requirement: Dict,
-        semaphore: asyncio.Semaphore,
         run_responses_dir: Path,
+        file_hash: Optional[str] = None,
     ) -> Dict:
+        """Evaluate a single requirement against an uploaded file, saving its raw response."""
+        async with response_writer() as write_queue:
+            return await self._evaluate_single_requirement(
+                file_ref,
+                requirement,
+                self._raw_response_path(run_responses_dir, requirement),
+                write_queue,
+                file_hash=file_hash,
+            )
+
+    async def _evaluate_gated(
+        self,
+        evaluations: List[Optional[Dict]],
+        index: int,
+        semaphore: asyncio.Semaphore,
+        file_ref: Dict,
+        requirement: Dict,
+        raw_file: Path,
+        write_queue: asyncio.Queue,
+        file_hash: Optional[str],
+    ) -> None:
+        """Evaluate one requirement into its slot, releasing the caller's semaphore slot."""
+        try:
+            evaluations[index] = await self._evaluate_single_requirement(
+                file_ref,
+                requirement,
+                raw_file,
+                write_queue,
+                file_hash=file_hash,
+            )
+        except Exception as exc:
+            # Never let one requirement cancel the whole TaskGroup
+            evaluations[index] = {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",
+                "rationale": str(exc),
+                "evidence": [],
+                "gaps": ["Evaluation failed"],
+                "recommendations": ["Retry requirement"],
+                "tokens_used": 0,
+            }
+        finally:
+            semaphore.release()
+
+    async def _evaluate_single_requirement(
+        self,
+        file_ref: Dict,
+        requirement: Dict,
+        raw_file: Path,
+        write_queue: asyncio.Queue,
+        file_hash: Optional[str] = None,
+    ) -> Dict:
+        cache_key = None
+        if self.use_response_cache and file_hash:
+            cache_key = self._response_cache_key(file_hash, requirement)
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                return cached
+
         if self.provider == "gemini":
-            return await self._evaluate_single_requirement_gemini(file_ref, requirement, semaphore, run_responses_dir)
-        return await self._evaluate_single_requirement_openai(
-            file_ref.get("file_id", ""),
-            requirement,
-            semaphore,
-            run_responses_dir,
-        )
+            result = await self._evaluate_single_requirement_gemini(
+                file_ref,
+                requirement,
+                raw_file,
+                write_queue,
+            )
+        else:
+            result = await self._evaluate_single_requirement_openai(
+                file_ref.get("file_id", ""),
+                requirement,
+                raw_file,
+                write_queue,
+            )
+
+        if cache_key and result.get("status") != "ERROR":
+            self._store_cached_response(cache_key, result)
+        return result
+
+    def _response_cache_key(self, file_hash: str, requirement: Dict) -> str:
+        prompt = self._build_prompt(requirement)
+        raw_key = f"{file_hash}|{requirement['id']}|{self.model}|{self.reasoning_effort}|{self.provider}|{prompt}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def _response_cache_db(self) -> sqlite3.Connection:
+        if self._response_cache is None:
+            # Only touched from the event loop thread; see the upload cache note in __init__
+            self._response_cache = sqlite3.connect(self.response_cache_path, check_same_thread=False)
+            self._response_cache.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "cache_key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at TEXT NOT NULL)"
+            )
+        return self._response_cache
+
+    def _get_cached_response(self, cache_key: str) -> Optional[Dict]:
+        row = self._response_cache_db().execute(
+            "SELECT result FROM responses WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row[0])
+        # Replays cost nothing, so they must not inflate the token/cost totals
+        result["tokens_used"] = 0
+        result["response_cache_hit"] = True
+        return result
+
+    def _store_cached_response(self, cache_key: str, result: Dict) -> None:
+        db = self._response_cache_db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (cache_key, result, created_at) VALUES (?, ?, ?)",
+                (cache_key, json.dumps(result), datetime.utcnow().isoformat()),
+            )
 
     async def _evaluate_single_requirement_openai(
         self,
         file_id: str,
         requirement: Dict,
-        semaphore: asyncio.Semaphore,
-        run_responses_dir: Path,
+        raw_file: Path,
+        write_queue: asyncio.Queue,
     ) -> Dict:
-        async with semaphore:
-            prompt = self._build_prompt(requirement)
+        prompt = self._build_prompt(requirement)
 
+        try:
+            response = await self._parse_with_retry(
+                requirement["id"],
+                model=self.model,
+                reasoning={"effort": self.reasoning_effort},
+                input=self._build_openai_input(prompt, file_id),
+                text_format=RequirementEvaluationSchema,
+            )
+        except AttributeError as attr_err:
+            logger.exception("Vision API attribute error for requirement %s", requirement['id'])
+            return {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",
+                "rationale": str(attr_err),
+                "evidence": [],
+                "gaps": ["OpenAI client lacks responses API"],
+                "recommendations": ["Upgrade openai package"],
+                "tokens_used": 0,
+            }
+
+        usage = getattr(response, "usage", None)
+        tokens_used = getattr(usage, "total_tokens", 0) if usage else 0
+
+        parsed_model = getattr(response, "output_parsed", None)
+        if parsed_model is None:
+            return {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",
+                "rationale": "Structured output missing from model response",
+                "evidence": [],
+                "gaps": ["Model response missing structured payload"],
+                "recommendations": ["Retry evaluation"],
+                "tokens_used": tokens_used,
+            }
+
+        parsed = parsed_model.model_dump()
+        parsed.setdefault("requirement_id", requirement["id"])
+        parsed.setdefault("requirement_title", requirement.get("title"))
+        parsed.setdefault("requirement_clause", requirement.get("clause"))
+        parsed["tokens_used"] = tokens_used
+        raw_text = getattr(response, "output_text", None) or parsed_model.model_dump_json
+        await write_queue.put((raw_file, raw_text))
+        return parsed
+
+    async def _parse_with_retry(self, requirement_id: str, **request: Any) -> Any:
+        """Call responses.parse, retrying transient failures with jittered exponential backoff."""
+        for attempt in range(1, MAX_API_ATTEMPTS + 1):
+            await self._wait_for_throttle()
             try:
-                response = await asyncio.to_thread(
-                    self.openai_client.responses.parse,  # type: ignore[union-attr]
-                    model=self.model,
-                    reasoning={"effort": self.reasoning_effort},
-                    input=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": prompt},
-                                {"type": "input_file", "file_id": file_id},
-                            ],
-                        }
-                    ],
-                    text_format=RequirementEvaluationSchema,
+                raw_response = await self._responses_client.responses.with_raw_response.parse(**request)
+            except RETRYABLE_OPENAI_ERRORS as exc:
+                if attempt == MAX_API_ATTEMPTS or _is_quota_error(exc):
+                    raise
+                error_response = getattr(exc, "response", None)
+                delay = self._retry_delay(attempt, getattr(error_response, "headers", None))
+                logger.warning(
+                    "%s for requirement %s (attempt %d/%d); retrying in %.1fs",
+                    type(exc).__name__, requirement_id, attempt, MAX_API_ATTEMPTS, delay,
                 )
-            except AttributeError as attr_err:
-                logger.exception("Vision API attribute error for requirement %s", requirement['id'])
-                return {
-                    "requirement_id": requirement["id"],
-                    "status": "ERROR",
-                    "confidence": "low",
-                    "rationale": str(attr_err),
-                    "evidence": [],
-                    "gaps": ["OpenAI client lacks responses API"],
-                    "recommendations": ["Upgrade openai package"],
-                    "tokens_used": 0,
-                }
-
-            usage = getattr(response, "usage", None)
-            tokens_used = getattr(usage, "total_tokens", 0) if usage else 0
-
-            parsed_model = getattr(response, "output_parsed", None)
-            if parsed_model is None:
-                return {
-                    "requirement_id": requirement["id"],
-                    "status": "ERROR",
-                    "confidence": "low",
-                    "rationale": "Structured output missing from model response",
-                    "evidence": [],
-                    "gaps": ["Model response missing structured payload"],
-                    "recommendations": ["Retry evaluation"],
-                    "tokens_used": tokens_used,
-                }
-
-            parsed = parsed_model.model_dump()
-            parsed.setdefault("requirement_id", requirement["id"])
-            parsed.setdefault("requirement_title", requirement.get("title"))
-            parsed.setdefault("requirement_clause", requirement.get("clause"))
-            parsed["tokens_used"] = tokens_used
-            raw_file = run_responses_dir / f"response_{requirement['id'].replace('-', '_')}.txt"
-            raw_text = getattr(response, "output_text", None) or json.dumps(parsed, indent=2)
-            raw_file.write_text(raw_text, encoding="utf-8")
-            return parsed
+                if isinstance(exc, RateLimitError):
+                    # The limit is shared by every worker, so back them all off
+                    await self._throttle_for(delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+
+            await self._apply_rate_limit_headers(raw_response.headers)
+            return raw_response.parse()
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    @staticmethod
+    def _retry_delay(attempt: int, headers: Optional[Any]) -> float:
+        retry_after = _parse_duration(headers.get("retry-after")) if headers else None
+        if retry_after is not None:
+            return min(retry_after, MAX_RETRY_DELAY_SECONDS)
+        return min(2 ** (attempt - 1) + random.uniform(0, 1), MAX_RETRY_DELAY_SECONDS)
+
+    async def _apply_rate_limit_headers(self, headers: Any) -> None:
+        remaining = headers.get("x-ratelimit-remaining-tokens")
+        if remaining is None or not remaining.isdigit() or int(remaining) >= self.min_remaining_tokens:
+            return
+        delay = (
+            _parse_duration(headers.get("retry-after"))
+            or _parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            or 1.0
+        )
+        logger.info("Only %s tokens left in the rate-limit window; pausing %.1fs", remaining, delay)
+        await self._throttle_for(min(delay, MAX_RETRY_DELAY_SECONDS))
+
+    async def _throttle_for(self, delay: float) -> None:
+        async with self._throttle_lock:
+            self._throttle_until = max(self._throttle_until, time.monotonic() + delay)
+
+    async def _wait_for_throttle(self) -> None:
+        # Sleep outside the lock and re-check, so every worker wakes together and
+        # a deadline extended during the pause is still honoured
+        while True:
+            async with self._throttle_lock:
+                wait = self._throttle_until - time.monotonic()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _evaluate_requirements_batch(
+        self,
+        file_id: str,
+        requirements: List[Dict],
+        run_responses_dir: Path,
+    ) -> List[Dict]:
+        """Submit every requirement as one OpenAI Batch API job and wait for its results."""
+        if self.openai_client is None:
+            raise RuntimeError("OpenAI client is not configured")
+
+        # Private SDK helper, imported here so only batch mode depends on it. It is
+        # the same conversion responses.parse applies, so batch and direct calls agree.
+        from openai.lib._pydantic import to_strict_json_schema
+
+        text_format = {
+            "format": {
+                "type": "json_schema",
+                "name": "requirement_evaluation",
+                "schema": to_strict_json_schema(RequirementEvaluationSchema),
+                "strict": True,
+            }
+        }
+        # custom_id must be unique per input file, and distinct requirements can share an ID
+        lines = [
+            json.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": {
+                    "model": self.model,
+                    "reasoning": {"effort": self.reasoning_effort},
+                    "input": self._build_openai_input(self._build_prompt(requirement), file_id),
+                    "text": text_format,
+                },
+            })
+            for index, requirement in enumerate(requirements)
+        ]
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        batch_input = run_responses_dir / "batch_input.jsonl"
+        batch_input.write_bytes(payload)
+
+        input_file = await self.openai_client.files.create(
+            file=(batch_input.name, payload),
+            purpose="batch",
+        )
+        batch = await self.openai_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+            metadata={"run": run_responses_dir.name},
+        )
+        logger.info("Submitted batch %s with %d requirements", batch.id, len(requirements))
+
+        # Poll with exponential backoff; batches usually take minutes, not seconds
+        delay = 5.0
+        started = time.monotonic()
+        while batch.status not in _BATCH_TERMINAL_STATUSES:
+            if time.monotonic() - started > self.batch_max_wait_seconds:
+                logger.error(
+                    "Batch %s still %s after %.0fs; cancelling",
+                    batch.id,
+                    batch.status,
+                    self.batch_max_wait_seconds,
+                )
+                batch = await self._cancel_batch(batch)
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.batch_poll_max_seconds)
+            batch = await self.openai_client.batches.retrieve(batch.id)
+            logger.info(
+                "Batch %s status=%s (%.0fs elapsed)",
+                batch.id,
+                batch.status,
+                time.monotonic() - started,
+            )
+
+        # Successful requests land in the output file, failed ones in the error file
+        records: Dict[str, Dict] = {}
+        for result_file_id in (batch.output_file_id, batch.error_file_id):
+            if not result_file_id:
+                continue
+            content = await self.openai_client.files.content(result_file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    records[record.get("custom_id")] = record
+        if batch.status != "completed":
+            logger.error("Batch %s finished with status %s", batch.id, batch.status)
+
+        return [
+            self._parse_batch_record(requirement, records.get(str(index)), run_responses_dir, batch.status)
+            for index, requirement in enumerate(requirements)
+        ]
+
+    async def _cancel_batch(self, batch):
+        """Cancel a batch and wait briefly for it to settle so finished requests are kept."""
+        batch = await self.openai_client.batches.cancel(batch.id)
+        deadline = time.monotonic() + BATCH_CANCEL_WAIT_SECONDS
+        while batch.status not in _BATCH_TERMINAL_STATUSES:
+            if time.monotonic() > deadline:
+                logger.error("Batch %s still %s after cancelling; keeping whatever results it has published", batch.id, batch.status)
+                break
+            await asyncio.sleep(BATCH_CANCEL_POLL_SECONDS)
+            batch = await self.openai_client.batches.retrieve(batch.id)
+        return batch
+
+    def _parse_batch_record(
+        self,
+        requirement: Dict,
+        record: Optional[Dict],
+        run_responses_dir: Path,
+        batch_status: str,
+    ) -> Dict:
+        response = (record or {}).get("response") or {}
+        body = response.get("body") or {}
+        if record is None or response.get("status_code") != 200:
+            error = (record or {}).get("error") or body.get("error") or f"batch {batch_status}"
+            return {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",
+                "rationale": f"Batch request failed: {error}",
+                "evidence": [],
+                "gaps": ["Batch request did not return a result"],
+                "recommendations": ["Retry requirement"],
+                "tokens_used": 0,
+            }
+
+        tokens_used = (body.get("usage") or {}).get("total_tokens", 0)
+        raw_text = "\n".join(
+            chunk.get("text", "")
+            for item in body.get("output") or []
+            for chunk in item.get("content") or []
+            if chunk.get("type") == "output_text"
+        )
+        self._raw_response_path(run_responses_dir, requirement).write_text(raw_text, encoding="utf-8")
+
+        try:
+            parsed = RequirementEvaluationSchema.model_validate_json(raw_text).model_dump()
+        except ValueError:
+            return {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",
+                "rationale": "Structured output missing from model response",
+                "evidence": [],
+                "gaps": ["Model response missing structured payload"],
+                "recommendations": ["Retry evaluation"],
+                "tokens_used": tokens_used,
+            }
+
+        parsed.setdefault("requirement_id", requirement["id"])
+        parsed.setdefault("requirement_title", requirement.get("title"))
+        parsed.setdefault("requirement_clause", requirement.get("clause"))
+        parsed["tokens_used"] = tokens_used
+        return parsed
 
     async def _evaluate_single_requirement_gemini(
         self,
         file_ref: Dict,
         requirement: Dict,
-        semaphore: asyncio.Semaphore,
-        run_responses_dir: Path,
+        raw_file: Path,
+        write_queue: asyncio.Queue,
     ) -> Dict:
-        async with semaphore:
-            prompt = self._build_prompt(requirement)
-            file_uri = file_ref.get("file_uri") or file_ref.get("file_id")
-            mime_type = file_ref.get("mime_type") or "application/pdf"
+        prompt = self._build_prompt(requirement)
+        file_uri = file_ref.get("file_uri") or file_ref.get("file_id")
+        mime_type = file_ref.get("mime_type") or "application/pdf"
 
-            try:
-                file_part = genai_types.Part(file_data=genai_types.FileData(file_uri=file_uri, mime_type=mime_type))  # type: ignore[arg-type]
-                if self.gemini_part_media_resolution is not None:
-                    file_part.media_resolution = self.gemini_part_media_resolution
-
-                gen_config_kwargs = {
-                    "response_mime_type": "application/json",
-                    "response_schema": self.gemini_response_schema,
-                }
-                if self.gemini_media_resolution is not None:
-                    gen_config_kwargs["media_resolution"] = self.gemini_media_resolution
-                if self.gemini_thinking_config is not None:
-                    gen_config_kwargs["thinking_config"] = self.gemini_thinking_config
-
-                response = await asyncio.to_thread(
-                    self.gemini_client.models.generate_content,  # type: ignore[union-attr]
-                    model=self.model,
-                    contents=[file_part, prompt],
-                    config=genai_types.GenerateContentConfig(**gen_config_kwargs),
-                )
-            except Exception as exc:
-                logger.exception("Gemini API error for requirement %s", requirement['id'])
-                return {
-                    "requirement_id": requirement["id"],
-                    "status": "ERROR",
-                    "confidence": "low",
-                    "rationale": str(exc),
-                    "evidence": [],
-                    "gaps": ["Gemini generate_content failed"],
-                    "recommendations": ["Retry requirement"],
-                    "tokens_used": 0,
-                }
-
-            usage = getattr(response, "usage_metadata", None)
-            tokens_used = getattr(usage, "total_token_count", 0) if usage else 0
-
-            parsed_model = getattr(response, "parsed", None)
-            parsed: Optional[Dict] = None
-            if parsed_model is not None:
-                parsed = parsed_model if isinstance(parsed_model, dict) else parsed_model.model_dump()
-            else:
-                response_text = getattr(response, "text", None)
-                if response_text:
-                    try:
-                        parsed = json.loads(response_text)
-                    except json.JSONDecodeError:
-                        parsed = None
-
-            if parsed is None:
-                raw_file = run_responses_dir / f"response_{requirement['id'].replace('-', '_')}.txt"
-                raw_file.write_text(getattr(response, "text", "") or "", encoding="utf-8")
-                return {
-                    "requirement_id": requirement["id"],
-                    "status": "ERROR",
-                    "confidence": "low",
-                    "rationale": "Structured output missing from Gemini response",
-                    "evidence": [],
-                    "gaps": ["Model response missing structured payload"],
-                    "recommendations": ["Retry evaluation"],
-                    "tokens_used": tokens_used,
-                }
-
-            parsed.setdefault("requirement_id", requirement["id"])
-            parsed.setdefault("requirement_title", requirement.get("title"))
-            parsed.setdefault("requirement_clause", requirement.get("clause"))
-            parsed["tokens_used"] = tokens_used
-
-            raw_file = run_responses_dir / f"response_{requirement['id'].replace('-', '_')}.txt"
-            raw_text = getattr(response, "text", None) or json.dumps(parsed, indent=2)
-            raw_file.write_text(raw_text, encoding="utf-8")
-            return parsed
+        try:
+            file_part = genai_types.Part(file_data=genai_types.FileData(file_uri=file_uri, mime_type=mime_type))  # type: ignore[arg-type]
+            if self.gemini_part_media_resolution is not None:
+                file_part.media_resolution = self.gemini_part_media_resolution
+
+            gen_config_kwargs = {
+                "response_mime_type": "application/json",
+                "response_schema": self.gemini_response_schema,
+            }
+            if self.gemini_media_resolution is not None:
+                gen_config_kwargs["media_resolution"] = self.gemini_media_resolution
+            if self.gemini_thinking_config is not None:
+                gen_config_kwargs["thinking_config"] = self.gemini_thinking_config
+
+            response = await asyncio.to_thread(
+                self.gemini_client.models.generate_content,  # type: ignore[union-attr]
+                model=self.model,
+                contents=[file_part, prompt],
+                config=genai_types.GenerateContentConfig(**gen_config_kwargs),
+            )
+        except Exception as exc:
+            logger.exception("Gemini API error for requirement %s", requirement['id'])
+            return {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",
+                "rationale": str(exc),
+                "evidence": [],
+                "gaps": ["Gemini generate_content failed"],
+                "recommendations": ["Retry requirement"],
+                "tokens_used": 0,
+            }
+
+        usage = getattr(response, "usage_metadata", None)
+        tokens_used = getattr(usage, "total_token_count", 0) if usage else 0
+
+        parsed_model = getattr(response, "parsed", None)
+        parsed: Optional[Dict] = None
+        if parsed_model is not None:
+            parsed = parsed_model if isinstance(parsed_model, dict) else parsed_model.model_dump()
+        else:
+            response_text = getattr(response, "text", None)
+            if response_text:
+                try:
+                    parsed = json.loads(response_text)
+                except json.JSONDecodeError:
+                    parsed = None
+
+        if parsed is None:
+            await write_queue.put((raw_file, getattr(response, "text", "") or ""))
+            return {
+                "requirement_id": requirement["id"],
+                "status": "ERROR",
+                "confidence": "low",
+                "rationale": "Structured output missing from Gemini response",
+                "evidence": [],
+                "gaps": ["Model response missing structured payload"],
+                "recommendations": ["Retry evaluation"],
+                "tokens_used": tokens_used,
+            }
+
+        parsed.setdefault("requirement_id", requirement["id"])
+        parsed.setdefault("requirement_title", requirement.get("title"))
+        parsed.setdefault("requirement_clause", requirement.get("clause"))
+        parsed["tokens_used"] = tokens_used
+
+        raw_text = getattr(response, "text", None) or functools.partial(json.dumps, parsed)
+        await write_queue.put((raw_file, raw_text))
+        return parsed
+
+    def _build_openai_input(self, prompt: str, file_id: str) -> List[Dict]:
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "input_text", "text": prompt},
+                    {"type": "input_file", "file_id": file_id},
+                ],
+            }
+        ]
 
     def _build_prompt(self, requirement: Dict) -> str:
         requirement_details = "\n".join([
@@ -458,34 +977,7 @@ Vision handling:
             f"- Expected Artifacts: {requirement.get('expected_artifacts', 'Not specified')}",
         ])
 
-        instruction_block = (
-            "MANDATORY METHOD:\n"
-            "1. Review the attached PDF for visuals (tables, charts, signatures) whenever the text layer is insufficient.\n"
-            "2. Evaluate ONLY the requested clause; cite page or section references for evidence. Treat clear cross-references to other SOPs/records as evidence that those processes/records exist.\n"
-            "3. Decision logic: PASS if the requirement is clearly addressed and practicable (minor OFIs allowed); FAIL if the process/records are missing or contradicted; FLAGGED when evidence is incomplete or genuinely uncertain; NOT_APPLICABLE only when the clause truly does not apply.\n"
-            "4. When in doubt between PASS and FLAGGED, choose PASS and note OFIs in the gaps/recommendations fields.\n"
-            "5. Before finalising, confirm the chosen status best matches the evidence; do not default to FLAGGED when PASS or FAIL is supported.\n"
-            "Respond strictly with JSON using this schema:\n"
-            "{\n"
-            "  \"status\": \"PASS|FAIL|FLAGGED|NOT_APPLICABLE\",\n"
-            "  \"confidence\": \"low|medium|high\",\n"
-            "  \"rationale\": \"Explain satisfied/unsatisfied criteria with citations\",\n"
-            "  \"evidence\": [\"Page/Section citation with quote\", ...],\n"
-            "  \"gaps\": [string],\n"
-            "  \"recommendations\": [string]\n"
-            "}\n"
-            "Use \"high\" confidence only when evidence is explicit and comprehensive, "
-            "\"medium\" when evidence is mixed but leans toward your status, and "
-            "\"low\" when evidence is sparse or uncertain.\n"
-        )
-
-        prompt_sections = [
-            self.BASE_INSTRUCTION,
-            "".join(instruction_block),
-            "Requirement:\n" + requirement_details,
-        ]
-
-        return "\n\n".join(prompt_sections)
+        return f"{self._prompt_prefix}\n\nRequirement:\n{requirement_details}"
 
     def _build_gemini_schema(self):
         if not GENAI_AVAILABLE or genai_types is None:
@@ -537,31 +1029,74 @@ Vision handling:
             return ""
 
     def _load_requirements(self) -> List[Dict]:
-        """Fetch ISO requirements from Supabase when available, otherwise use local copy."""
-        if self.supabase is not None:
-            try:
-                query = self.supabase.table('iso_requirements').select('*').order('id')
-                if self.requirements_limit > 0:
-                    query = query.limit(self.requirements_limit)
-                response = query.execute()
-                if response.data:
-                    return response.data
-                print("Warning: Supabase returned no requirements. Falling back to local file.")
-            except Exception as exc:
-                print(f"Warning: Failed to load requirements from Supabase ({exc}). Falling back to local file.")
-
-        requirements = json.loads(self.requirements_path.read_text())
+        """Fetch ISO requirements per VISION_REQUIREMENTS_SOURCE, otherwise use local copy.
+
+        ``auto`` reuses a recent Supabase snapshot before querying again,
+        ``supabase`` always queries, and ``local`` never does.
+        """
+        requirements: Optional[List[Dict]] = None
+        if self.requirements_source == "supabase" and self.supabase is not None:
+            requirements = self._fetch_supabase_requirements(self.requirements_limit)
+        elif self.requirements_source == "auto" and self.supabase is not None:
+            requirements = self._read_requirements_snapshot()
+            if requirements is None:
+                requirements = self._fetch_supabase_requirements()
+
+        if requirements is None:
+            requirements = json.loads(self.requirements_path.read_text())
         if self.requirements_limit > 0:
             return requirements[: self.requirements_limit]
         return requirements
 
+    def _fetch_supabase_requirements(self, limit: int = 0) -> Optional[List[Dict]]:
+        """Query Supabase for requirements; an unlimited fetch also refreshes the snapshot."""
+        try:
+            if limit > 0:
+                response = self.supabase.table('iso_requirements').select('*').order('id').limit(limit).execute()  # type: ignore[union-attr]
+                rows = response.data or []
+            else:
+                rows = []
+                while True:
+                    response = (
+                        self.supabase.table('iso_requirements')  # type: ignore[union-attr]
+                        .select('*')
+                        .order('id')
+                        .range(len(rows), len(rows) + SUPABASE_PAGE_SIZE - 1)
+                        .execute()
+                    )
+                    page = response.data or []
+                    rows.extend(page)
+                    if len(page) < SUPABASE_PAGE_SIZE:
+                        break
+        except Exception as exc:
+            print(f"Warning: Failed to load requirements from Supabase ({exc}). Falling back to local file.")
+            return None
+        if not rows:
+            print("Warning: Supabase returned no requirements. Falling back to local file.")
+            return None
+
+        if limit <= 0:
+            tmp_path = self.requirements_snapshot_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(rows), encoding="utf-8")
+            os.replace(tmp_path, self.requirements_snapshot_path)
+        return rows
+
+    def _read_requirements_snapshot(self) -> Optional[List[Dict]]:
+        try:
+            snapshot_mtime = self.requirements_snapshot_path.stat().st_mtime
+            if time.time() - snapshot_mtime > self.requirements_snapshot_ttl:
+                return None
+            # A local requirements file edited since the last fetch means the snapshot may be outdated too
+            if self.requirements_path.exists() and self.requirements_path.stat().st_mtime > snapshot_mtime:
+                return None
+            return json.loads(self.requirements_snapshot_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+
     def _generate_summary(self, document_stats: Dict, results: List[Dict]) -> Dict:
         status_counts: Dict[str, int] = {"PASS": 0, "FAIL": 0, "FLAGGED": 0, "NOT_APPLICABLE": 0, "ERROR": 0}
-        total_tokens = 0
-        for result in results:
-            status = result.get("status", "ERROR")
-            status_counts[status] = status_counts.get(status, 0) + 1
-            total_tokens += result.get("tokens_used", 0)
+        status_counts.update(Counter(result.get("status", "ERROR") for result in results))
+        total_tokens = sum(result.get("tokens_used", 0) or 0 for result in results)
 
         scored = len(results) - status_counts.get("ERROR", 0)
         compliance_score = (status_counts.get("PASS", 0) / scored * 100) if scored else 0
@@ -582,37 +1117,38 @@ Vision handling:
 
     def _persist_summary(self, summary: Dict, run_id: str) -> None:
         json_path = self.output_dir / f"vision_evaluation_{run_id}.json"
-        json_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        with json_path.open("w", encoding="utf-8") as handle:
+            json.dump(summary, handle, indent=2)
 
         excel_path = self.output_dir / f"vision_evaluation_{run_id}.xlsx"
         self._export_to_excel(summary, excel_path)
 
     def _export_to_excel(self, summary: Dict, excel_path: Path) -> None:
-        workbook = Workbook()
-        summary_sheet = workbook.active
-        summary_sheet.title = "Summary"
+        write_workbook(excel_path, [
+            ("Summary", self._summary_rows(summary)),
+            ("Requirements", self._requirement_rows(summary)),
+        ])
 
-        summary_sheet.append(["Field", "Value"])
+    def _summary_rows(self, summary: Dict) -> Iterator[List]:
+        yield ["Field", "Value"]
         for key, value in summary.get("document_info", {}).items():
-            summary_sheet.append([key.replace('_', ' ').title(), value])
+            yield [key.replace('_', ' ').title(), value]
 
-        summary_sheet.append([])
-        summary_sheet.append(["Metric", "Value"])
+        yield []
+        yield ["Metric", "Value"]
         evaluation_summary = summary.get("evaluation_summary", {})
         for key, value in evaluation_summary.items():
             if key == "status_counts":
                 continue
-            summary_sheet.append([key.replace('_', ' ').title(), value])
+            yield [key.replace('_', ' ').title(), value]
 
-        summary_sheet.append([])
-        summary_sheet.append(["Status", "Count"])
+        yield []
+        yield ["Status", "Count"]
         for status, count in evaluation_summary.get("status_counts", {}).items():
-            summary_sheet.append([status, count])
+            yield [status, count]
 
-        self._auto_size_columns(summary_sheet)
-
-        requirements_sheet = workbook.create_sheet(title="Requirements")
-        headers = [
+    def _requirement_rows(self, summary: Dict) -> Iterator[List]:
+        yield [
             "Requirement ID",
             "Status",
             "Confidence",
@@ -622,10 +1158,8 @@ Vision handling:
             "Recommendations",
             "Tokens Used",
         ]
-        requirements_sheet.append(headers)
-
         for record in summary.get("requirements_results", []):
-            requirements_sheet.append([
+            yield [
                 record.get("requirement_id"),
                 record.get("status"),
                 str(record.get("confidence", "low")).upper(),
@@ -634,26 +1168,29 @@ Vision handling:
                 "\n".join(record.get("gaps", [])),
                 "\n".join(record.get("recommendations", [])),
                 record.get("tokens_used", 0),
-            ])
-
-        self._auto_size_columns(requirements_sheet)
-        workbook.save(excel_path)
-
-    def _auto_size_columns(self, worksheet) -> None:
-        for column_cells in worksheet.columns:
-            length = max(len(str(cell.value or "")) for cell in column_cells)
-            worksheet.column_dimensions[get_column_letter(column_cells[0].column)].width = min(length + 2, 80)
+            ]
 
     def _load_cache(self) -> Dict[str, Dict[str, Any]]:
-        if self.cache_path.exists():
+        rows = self._file_cache_db.execute("SELECT file_hash, meta FROM files").fetchall()
+        if not rows and self.legacy_cache_path.exists():
+            # Seed from the pre-sqlite JSON cache so existing uploads are reused
             try:
-                return json.loads(self.cache_path.read_text())
+                legacy = json.loads(self.legacy_cache_path.read_text())
             except json.JSONDecodeError:
-                return {}
-        return {}
-
-    def _save_cache(self) -> None:
-        self.cache_path.write_text(json.dumps(self.file_cache, indent=2), encoding="utf-8")
+                legacy = {}
+            self._file_cache_db.executemany(
+                "INSERT OR IGNORE INTO files (file_hash, meta, uploaded_at) VALUES (?, ?, ?)",
+                [(file_hash, json.dumps(meta), meta.get("uploaded_at")) for file_hash, meta in legacy.items()],
+            )
+            return legacy
+        return {file_hash: json.loads(meta) for file_hash, meta in rows}
+
+    def _save_cache(self, file_hash: str) -> None:
+        meta = self.file_cache[file_hash]
+        self._file_cache_db.execute(
+            "INSERT OR REPLACE INTO files (file_hash, meta, uploaded_at) VALUES (?, ?, ?)",
+            (file_hash, json.dumps(meta), meta.get("uploaded_at")),
+        )
 
     def _resolve_gemini_thinking_config(self) -> Optional["genai_types.ThinkingConfig"]:
         if not GENAI_AVAILABLE or genai_types is None:
@@ -725,6 +1262,16 @@ class DualVisionComparator:
         self.model = f"{self.primary.model}+{self.secondary.model}"
         self.supabase = self.primary.supabase or self.secondary.supabase
 
+    async def __aenter__(self) -> "DualVisionComparator":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.primary.aclose()
+        await self.secondary.aclose()
+
     async def evaluate_document(self, file_path: str) -> Dict[str, Any]:
         openai_summary = await self.primary.evaluate_document(file_path)
         gemini_summary = await self.secondary.evaluate_document(file_path)
@@ -860,9 +1407,9 @@ class DualVisionComparator:
 
 
 
-async def _async_main(file_path: str) -> None:
-    evaluator = VisionResponsesEvaluator()
-    summary = await evaluator.evaluate_document(file_path)
+async def _async_main(file_path: str, batch: Optional[bool] = None) -> None:
+    async with VisionResponsesEvaluator(batch=batch) as evaluator:
+        summary = await evaluator.evaluate_document(file_path)
 
     counts = summary["evaluation_summary"]["status_counts"]
     print("\n=== Vision Evaluation Complete ===")
@@ -878,9 +1425,14 @@ async def _async_main(file_path: str) -> None:
 def main() -> None:
     parser = argparse.ArgumentParser(description="ISO 14971 vision-based evaluator")
     parser.add_argument("file_path", help="Path to PDF file to evaluate")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit requirements through the OpenAI Batch API (cheaper, asynchronous)",
+    )
     args = parser.parse_args()
 
-    asyncio.run(_async_main(args.file_path))
+    asyncio.run(_async_main(args.file_path, batch=True if args.batch else None))
 
 
 if __name__ == "__main__":